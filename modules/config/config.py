@@ -92,3 +92,121 @@ Generate a complete semantic graph that enables natural language queries about c
 MAX_CHUNK_SIZE = 8000
 LARGE_FILE_THRESHOLD = 15000
 CHUNK_OVERLAP_LINES = 10
+# "ast" packs whole functions and classes into chunks, "lines" splits at
+# line boundaries with CHUNK_OVERLAP_LINES of overlap
+CHUNKING_STRATEGY = "ast"
+# Pack consecutive files under LARGE_FILE_THRESHOLD into one LLM request of
+# at most PACK_MAX_FILES files and PACK_MAX_TOKENS estimated code tokens
+FILE_PACKING = True
+PACK_MAX_FILES = 8
+PACK_MAX_TOKENS = 6000
+
+# Concurrency configuration for LLM extraction
+MAX_CONCURRENT_FILES = 8
+MAX_CONCURRENT_LLM_REQUESTS = 8
+
+# LLM backends used for extraction. Every backend that initializes is kept
+# and requests are spread across them (see modules/llm/router.py); gemini
+# and openai are skipped when their API key is not set, ollama when its
+# server does not answer within OLLAMA_PROBE_TIMEOUT_SECONDS or does not
+# have OLLAMA_MODEL pulled
+LLM_BACKENDS = ["gemini", "openai", "ollama"]
+OLLAMA_MODEL = "gemma3n:latest"
+OLLAMA_PROBE_TIMEOUT_SECONDS = 2
+
+# LLM provider quotas (see modules/llm/scheduler.py); None means no limit.
+# Requests are queued to stay under these, and transient failures are
+# retried up to LLM_MAX_RETRIES times with jittered exponential backoff
+LLM_RATE_LIMITS = {
+    "gemini": {"requests_per_minute": 15, "tokens_per_minute": 1_000_000},
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 200_000},
+    "ollama": None,
+}
+LLM_MAX_RETRIES = 5
+LLM_BACKOFF_BASE_SECONDS = 2
+LLM_BACKOFF_MAX_SECONDS = 60
+
+# Streaming ingestion configuration: records are written to Neo4j while
+# later files are still being extracted, with at most STREAM_BUFFER_SIZE
+# files in flight between extraction and the writer
+STREAMING_INGESTION = True
+STREAM_BUFFER_SIZE = 64
+# Relationships waiting for an endpoint that has not been written yet are
+# spilled to a temporary file beyond this many
+STREAM_DEFERRED_MAX = 10_000
+
+# Extraction cache configuration
+EXTRACTION_CACHE_FILE = "outputs/cache/extraction_cache.sqlite"
+EXTRACTION_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Incremental ingestion configuration
+INCREMENTAL_INGESTION = False
+FILE_MANIFEST_FILE = "outputs/file_manifest.json"
+
+# Bumped after every ingestion so readers know their snapshots are stale
+GRAPH_VERSION_FILE = "outputs/graph_version.json"
+
+# Query Bot semantic cache: questions whose embeddings are at least
+# QUERY_CACHE_SIMILARITY similar reuse the cached translation
+QUERY_CACHE_MAX_ENTRIES = 256
+QUERY_CACHE_TTL_SECONDS = 60 * 60
+QUERY_CACHE_SIMILARITY = 0.85
+
+# Rows of a Query Bot result given to the LLM and returned as raw results;
+# larger results are streamed in QUERY_STREAM_BATCH_SIZE row batches
+QUERY_TOP_K = 50
+QUERY_STREAM_BATCH_SIZE = 1000
+
+# Memory bound of the read query result cache, shared by the Query Bot and
+# the dashboards; results are reused until the next ingestion
+QUERY_RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Store fan-in/fan-out, SCCs, import layers and reachability labels on the
+# nodes after every ingestion (see modules/utils/graph_indexes.py)
+DERIVED_INDEXES = True
+
+# Backend serving the visualizer and analytics: "neo4j" or "memory"
+# (in-process graph store built from the parsed JSON). With "memory",
+# ingestion writes nothing to Neo4j, so no database service is needed;
+# the Query Bot still requires Neo4j
+GRAPH_BACKEND = "neo4j"
+
+# Upper bound on nodes plus edges rendered by the CodeBase Visualizer; the
+# overview is aggregated and expansions are truncated to fit
+VISUALIZER_MAX_ELEMENTS = 400
+
+# Precompute node positions after every ingestion so the visualizer renders
+# with physics disabled (see modules/utils/graph_layout.py)
+GRAPH_LAYOUT = True
+GRAPH_LAYOUT_FILE = "outputs/graph_layout.json"
+
+# Write a columnar (Parquet) snapshot of the parsed graph after every
+# ingestion for the analytics dashboard (see modules/utils/graph_snapshot.py)
+GRAPH_SNAPSHOT = True
+GRAPH_SNAPSHOT_DIR = "outputs/snapshot"
+
+# Neo4j bulk loading configuration
+NEO4J_BATCH_SIZE = 1000
+NEO4J_BATCH_RETRIES = 3
+
+# Neo4j connection pool configuration (see neo4j_functions.get_driver)
+NEO4J_MAX_POOL_SIZE = 50
+# Seconds to wait for a free pooled connection before failing
+NEO4J_ACQUISITION_TIMEOUT = 30
+# Pooled connections idle for longer than this many seconds are pinged
+# before reuse, so connections dropped by the server are replaced
+NEO4J_LIVENESS_CHECK_TIMEOUT = 30
+# Seconds after which a pooled connection is retired
+NEO4J_MAX_CONNECTION_LIFETIME = 3600
+
+# Offline neo4j-admin import configuration
+NEO4J_ADMIN_IMPORT_DIR = "outputs/neo4j_import"
+NEO4J_ADMIN_PATH = "neo4j-admin"
+
+# Extraction mode: "llm" (LLM only), "ast" (parser only, no LLM calls) or
+# "hybrid" (ast structure enriched with LLM semantics)
+EXTRACTION_MODE = "llm"
+
+# Worker processes for parser-only ingestion; None uses every CPU core and
+# 1 keeps extraction in the main process
+INGESTION_PROCESSES = None
@@ -1,28 +1,83 @@
 import streamlit as st
-import json
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from pathlib import Path
+from modules.config.config import GRAPH_BACKEND
+from modules.utils.graph_snapshot import get_snapshot_key, load_graph_snapshot
+from modules.utils.graph_store import get_graph_store
 
-def read_parse_data(file_path: Path) -> dict:
-    """Safely read and parse the JSON data file."""
-    if not file_path.exists():
+PARSED_CODE_FILE = "outputs/parsed_code.json"
+
+
+def load_store_frames():
+    """
+    The columns load_analytics needs, read from the in-memory graph store
+
+    Returns:
+        tuple: (nodes DataFrame, relationships DataFrame, metadata dict), or
+            None if there is no parsed graph
+    """
+    store = get_graph_store(PARSED_CODE_FILE)
+    if not store.node_count:
+        return None
+    df_nodes = pd.DataFrame({"type": store.labels, "properties.file_path": store.file_paths})
+    df_relationships = pd.DataFrame(
+        {"relationship_type": np.array(store.rel_types, dtype=object)[store.edge_types]}
+    )
+    metadata = {
+        "node_count": store.node_count,
+        "relationship_count": store.edge_count,
+        "processed_file_count": store.processed_file_count,
+    }
+    return df_nodes, df_relationships, metadata
+
+
+@st.cache_data(show_spinner=False)
+def load_analytics(snapshot_key) -> dict:
+    """
+    Aggregate the columnar snapshot (or the in-memory graph store) into the
+    small frames the page plots.
+
+    Only the type columns and the file path are read from Parquet; the
+    snapshot key changes after every ingestion, which invalidates the cache.
+    """
+    if GRAPH_BACKEND == "memory":
+        snapshot = load_store_frames()
+    else:
+        snapshot = load_graph_snapshot(
+            PARSED_CODE_FILE,
+            node_columns=["type", "properties.file_path"],
+            relationship_columns=["relationship_type"],
+        )
+    if snapshot is None:
         return {}
-    with open(file_path, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            print(f"❌ Analytics error: Could not decode the JSON file `{file_path}`.")
-            return {}
-
-def plot_node_distribution(df_nodes: pd.DataFrame):
+    df_nodes, df_relationships, metadata = snapshot
+
+    node_counts = df_nodes['type'].value_counts().reset_index()
+    node_counts.columns = ['Node Type', 'Count']
+
+    relationship_counts = df_relationships['relationship_type'].value_counts().reset_index()
+    relationship_counts.columns = ['Relationship Type', 'Count']
+
+    df_filtered = df_nodes[df_nodes['type'].isin(['Function', 'Class'])]
+    if 'properties.file_path' in df_filtered.columns:
+        file_names = df_filtered['properties.file_path'].fillna('Unknown')
+    else:
+        file_names = pd.Series('Unknown', index=df_filtered.index)
+    complexity_df = df_filtered.groupby([file_names.rename('file_name'), 'type']).size().unstack(fill_value=0).reset_index()
+
+    return {
+        "metadata": metadata,
+        "node_counts": node_counts,
+        "relationship_counts": relationship_counts,
+        "complexity": complexity_df,
+    }
+
+def plot_node_distribution(node_counts: pd.DataFrame):
     """Display a bar chart of node types."""
     st.markdown("#### 🧐 Node Type Distribution")
     st.write("This chart shows the counts of different types of code structures (nodes) found in the project, such as functions, classes, and variables.")
     
-    node_counts = df_nodes['type'].value_counts().reset_index()
-    node_counts.columns = ['Node Type', 'Count']
-    
     fig = px.bar(
         node_counts, 
         x='Node Type', 
@@ -33,14 +88,11 @@ def plot_node_distribution(df_nodes: pd.DataFrame):
     )
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_relationship_distribution(df_relationships: pd.DataFrame):
+def plot_relationship_distribution(relationship_counts: pd.DataFrame):
     """Display a bar chart of relationship types."""
     st.markdown("#### 🔗 Relationship Type Distribution")
     st.write("This chart illustrates how different parts of the code are connected. For example, `CALLS` shows function calls, and `IMPORTS` shows module dependencies.")
     
-    relationship_counts = df_relationships['relationship_type'].value_counts().reset_index()
-    relationship_counts.columns = ['Relationship Type', 'Count']
-    
     fig = px.bar(
         relationship_counts, 
         x='Relationship Type', 
@@ -51,20 +103,13 @@ def plot_relationship_distribution(df_relationships: pd.DataFrame):
     )
     st.plotly_chart(fig, use_container_width=True)
 
-def show_file_complexity(df_nodes: pd.DataFrame):
+def show_file_complexity(complexity_df: pd.DataFrame):
     """Display a table with file complexity metrics."""
     st.markdown("#### 🗂️ File Complexity Analysis")
     st.write("This table breaks down the number of classes and functions in each file, helping to identify more complex parts of the codebase.")
 
-    # Filter for functions and classes and ensure 'file_path' exists
-    df_filtered = df_nodes[df_nodes['type'].isin(['Function', 'Class'])].copy()
-    
-    # Extract file name from properties
-    df_filtered['file_name'] = df_filtered['properties'].apply(lambda props: props.get('file_path', 'Unknown'))
-    
-    # Group by file and type, then unstack
-    complexity_df = df_filtered.groupby(['file_name', 'type']).size().unstack(fill_value=0).reset_index()
-    
+    complexity_df = complexity_df.copy()
+
     # Ensure both columns exist
     if 'Function' not in complexity_df.columns:
         complexity_df['Function'] = 0
@@ -84,31 +129,28 @@ def show_analytics():
     
     st.markdown("<hr/>", unsafe_allow_html=True)
     
-    output_file = Path("outputs/parsed_code.json")
-    data = read_parse_data(output_file)
+    analytics = load_analytics(get_snapshot_key(PARSED_CODE_FILE))
     
-    if not data or 'nodes' not in data or 'relationships' not in data:
+    if not analytics:
         st.info("No analytics data is available. Run the analysis from the Home page first.")
         return
-        
-    df_nodes = pd.DataFrame(data['nodes'])
-    df_relationships = pd.DataFrame(data['relationships'])
+    metadata = analytics["metadata"]
 
     # --- Overview Metrics ---
     st.markdown("#### At a Glance")
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Files Processed", len(data.get("processed_files", [])))
-    col2.metric("Total Nodes", data.get("node_count", 0))
-    col3.metric("Total Relationships", data.get("relationship_count", 0))
+    col1.metric("Total Files Processed", metadata.get("processed_file_count", 0))
+    col2.metric("Total Nodes", metadata.get("node_count", 0))
+    col3.metric("Total Relationships", metadata.get("relationship_count", 0))
     st.markdown("<hr/>", unsafe_allow_html=True)
 
     # --- Distribution Plots in Columns ---
     col_plot1, col_plot2 = st.columns(2)
     with col_plot1:
-        plot_node_distribution(df_nodes)
+        plot_node_distribution(analytics["node_counts"])
     with col_plot2:
-        plot_relationship_distribution(df_relationships)
+        plot_relationship_distribution(analytics["relationship_counts"])
     st.markdown("<hr/>", unsafe_allow_html=True)
     
     # --- Complexity Table ---
-    show_file_complexity(df_nodes) 
\ No newline at end of file
+    show_file_complexity(analytics["complexity"]) 
\ No newline at end of file
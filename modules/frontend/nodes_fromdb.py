@@ -1,56 +1,353 @@
 from pyvis.network import Network
 import networkx as nx
-from neo4j import GraphDatabase
-import os
-from dotenv import load_dotenv
+import numpy as np
+import pandas as pd
 from modules.frontend.utils import get_color_map
+from modules.config.config import GRAPH_BACKEND, VISUALIZER_MAX_ELEMENTS
+from modules.utils.file_utils import load_graph_layout
+from modules.utils.graph_snapshot import get_snapshot_key, load_graph_snapshot
+from modules.utils.graph_store import get_graph_store
+from modules.utils.neo4j_async import run_async, cached_read_query, read_queries
 import streamlit as st
 from streamlit.components.v1 import html
 
 
-load_dotenv(override=True)
+FULL_CODEBASE_QUERY = """
+    MATCH (n)-[r]->(m)
+    RETURN 
+        ID(n) AS source_id,
+        n.name AS source_name,
+        labels(n)[0] AS source_label,
+        ID(m) AS target_id,
+        m.name AS target_name,
+        labels(m)[0] AS target_label,
+        type(r) AS relation
+    """
 
-NEO4J_USER="neo4j"
-driver = GraphDatabase.driver(os.getenv("NEO4J_URI"), auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")))
+ALL_NODES_QUERY = """
+    MATCH (n)
+    RETURN 
+        ID(n) AS node_id,
+        n.name AS name,
+        labels(n)[0] AS label,
+        n.layout_x AS x,
+        n.layout_y AS y
+    """
+
+
+PARSED_CODE_FILE = "outputs/parsed_code.json"
+
+# Overview bucket of the nodes no module CONTAINS (e.g. from files the
+# LLM extracted without a Module node), so they stay reachable
+UNASSIGNED_MODULE = "(unassigned)"
+
+
+def run_read_query(query, params=None):
+    """Run a read query on the async driver, reusing its rows until the next ingestion"""
+    return run_async(cached_read_query(query, params))
 
-if driver.verify_connectivity():
-    print("Connected to Neo4j")
-else:
-    print("Failed to connect to Neo4j")
 
 def get_full_codebase():
-    with driver.session() as session:
-        query = """
-        MATCH (n)-[r]->(m)
-        RETURN 
-            ID(n) AS source_id,
-            n.name AS source_name,
-            labels(n)[0] AS source_label,
-            ID(m) AS target_id,
-            m.name AS target_name,
-            labels(m)[0] AS target_label,
-            type(r) AS relation
-        """
-        result = session.run(query)
-        return result.data()
+    if GRAPH_BACKEND == "memory":
+        return get_graph_store().all_edges()
+    return run_read_query(FULL_CODEBASE_QUERY)
     
 def fetch_all_nodes():
-    with driver.session() as session:
-        result = session.run("""
-        MATCH (n)
-        RETURN 
-            ID(n) AS node_id,
-            n.name AS name,
-            labels(n)[0] AS label
-        """)
-        return [record.data() for record in result]
-    
+    if GRAPH_BACKEND == "memory":
+        return get_graph_store().all_nodes()
+    return run_read_query(ALL_NODES_QUERY)
+
+
+def collapse_to_packages(nodes, edges, max_elements):
+    """
+    Merge modules into their parent packages until the overview fits in
+    max_elements nodes plus edges, then keep the heaviest edges
+    """
+    depth = max((len(n["id"].split(".")) for n in nodes), default=1)
+    while len(nodes) + len(edges) > max_elements and depth > 1:
+        depth -= 1
+        merged_nodes, merged_edges = {}, {}
+        for node in nodes:
+            package = ".".join(node["id"].split(".")[:depth])
+            merged = merged_nodes.setdefault(
+                package, {"id": package, "name": package, "label": "Package", "size": 0, "positions": []}
+            )
+            merged["size"] += node["size"]
+            if package == node["id"]:
+                merged["label"] = node["label"]
+            merged["positions"].extend(
+                node.get("positions") or ([(node["x"], node["y"])] if node.get("x") is not None else [])
+            )
+        for edge in edges:
+            source = ".".join(edge["source"].split(".")[:depth])
+            target = ".".join(edge["target"].split(".")[:depth])
+            if source == target:
+                continue
+            key = (source, target, edge["relation"])
+            merged = merged_edges.setdefault(
+                key, {"source": source, "target": target, "relation": edge["relation"], "weight": 0}
+            )
+            merged["weight"] += edge["weight"]
+        nodes, edges = list(merged_nodes.values()), list(merged_edges.values())
+        # A package sits at the centroid of the modules it merges
+        for node in nodes:
+            if node["positions"]:
+                node["x"] = sum(x for x, _ in node["positions"]) / len(node["positions"])
+                node["y"] = sum(y for _, y in node["positions"]) / len(node["positions"])
+
+    edge_budget = max(0, max_elements - len(nodes))
+    edges = sorted(edges, key=lambda e: e["weight"], reverse=True)[:edge_budget]
+    return nodes, edges
+
+
+@st.cache_data(show_spinner=False)
+def load_snapshot_overview(snapshot_key):
+    """
+    Module overview aggregated from the columnar snapshot, which carries
+    the module_id written by the derived indexes stage, so rendering it
+    does not scan the whole Neo4j graph
+
+    Returns:
+        tuple: (nodes, edges) like the Neo4j aggregates, or None if there
+            is no snapshot with module ids
+    """
+    snapshot = load_graph_snapshot(
+        PARSED_CODE_FILE,
+        node_columns=["id", "type", "properties.name", "properties.module_id"],
+        relationship_columns=["source_id", "target_id", "relationship_type"],
+    )
+    if snapshot is None or "properties.module_id" not in snapshot[0].columns:
+        return None
+    df_nodes, df_relationships, _ = snapshot
+
+    layout = load_graph_layout()
+    positions = [layout.get(node_id) or (None, None) for node_id in df_nodes["id"]]
+    df_nodes = df_nodes.assign(
+        module=df_nodes["properties.module_id"].fillna(UNASSIGNED_MODULE),
+        x=pd.to_numeric([p[0] for p in positions]),
+        y=pd.to_numeric([p[1] for p in positions]),
+    )
+
+    def position(value):
+        return None if pd.isna(value) else float(value)
+
+    sizes = df_nodes.groupby("module").agg(size=("id", "size"), x=("x", "mean"), y=("y", "mean"))
+    modules = df_nodes[df_nodes["type"] == "Module"]
+    names = modules.get("properties.name", modules["id"]).fillna(modules["id"])
+    nodes = [
+        {
+            "id": module_id,
+            "name": name,
+            "label": "Module",
+            "size": int(sizes.at[module_id, "size"]),
+            "x": position(x),
+            "y": position(y),
+        }
+        for module_id, name, x, y in zip(modules["id"], names, modules["x"], modules["y"])
+    ]
+    if UNASSIGNED_MODULE in sizes.index:
+        unassigned = sizes.loc[UNASSIGNED_MODULE]
+        nodes.append({
+            "id": UNASSIGNED_MODULE, "name": "Unassigned", "label": "Unassigned",
+            "size": int(unassigned["size"]), "x": position(unassigned["x"]), "y": position(unassigned["y"]),
+        })
+
+    # Relationships whose endpoints are not in the graph never reach Neo4j
+    module_by_id = pd.Series(df_nodes["module"].values, index=df_nodes["id"])
+    pairs = pd.DataFrame({
+        "source": df_relationships["source_id"].map(module_by_id),
+        "target": df_relationships["target_id"].map(module_by_id),
+        "relation": df_relationships["relationship_type"],
+    }).dropna()
+    pairs = pairs[pairs["source"] != pairs["target"]]
+    weights = pairs.groupby(["source", "target", "relation"]).size().reset_index(name="weight")
+    edges = [
+        {**row, "weight": int(row["weight"])} for row in weights.to_dict("records")
+    ]
+    return nodes, edges
 
 
-def build_network_graph(data):
+def get_module_overview(max_elements=VISUALIZER_MAX_ELEMENTS):
+    """
+    Module level view of the graph: one node per module sized by its
+    members, one edge per related module pair weighted by the number of
+    underlying relationships. Modules are merged into packages when there
+    are more than max_elements nodes and edges.
+
+    Returns:
+        tuple: (nodes {'id', 'name', 'label', 'size'},
+            edges {'source', 'target', 'relation', 'weight'})
+    """
+    overview = None
+    if GRAPH_BACKEND != "memory":
+        overview = load_snapshot_overview(get_snapshot_key(PARSED_CODE_FILE))
+
+    if GRAPH_BACKEND == "memory":
+        nodes, edges = get_graph_store().module_overview(UNASSIGNED_MODULE)
+    elif overview is not None:
+        nodes, edges = overview
+    else:
+        # No snapshot with module ids yet, so the aggregates run on Neo4j;
+        # the three are independent, so they run concurrently
+        params = {"unassigned": UNASSIGNED_MODULE}
+        size_rows, module_rows, edges = read_queries(
+            ("""
+            MATCH (n)
+            RETURN coalesce(n.module_id, $unassigned) AS id, count(*) AS size,
+                avg(n.layout_x) AS x, avg(n.layout_y) AS y
+            """, params),
+            ("""
+            MATCH (m:Module)
+            RETURN m.id AS id, m.name AS name, m.layout_x AS x, m.layout_y AS y
+            """, None),
+            ("""
+            MATCH (a)-[r]->(b)
+            WITH coalesce(a.module_id, $unassigned) AS source,
+                coalesce(b.module_id, $unassigned) AS target, type(r) AS relation
+            WHERE source <> target
+            RETURN source, target, relation, count(*) AS weight
+            """, params),
+        )
+        sizes = {row["id"]: row for row in size_rows}
+        nodes = [
+            {**row, "label": "Module", "size": sizes[row["id"]]["size"] if row["id"] in sizes else 0}
+            for row in module_rows
+        ]
+        unassigned = sizes.get(UNASSIGNED_MODULE)
+        if unassigned:
+            nodes.append({**unassigned, "name": "Unassigned", "label": "Unassigned"})
+    return collapse_to_packages(nodes, edges, max_elements)
+
+
+def get_module_subgraph(module_id, hops=1, max_elements=VISUALIZER_MAX_ELEMENTS):
+    """
+    Members of a module, its submodules (or those of a package) and their
+    neighborhood, expanded one bounded hop at a time. UNASSIGNED_MODULE
+    selects the nodes outside any module.
+
+    Returns:
+        tuple: (node records like fetch_all_nodes, edge records like
+            get_full_codebase)
+    """
+    max_nodes = max(1, max_elements // 3)
+    if GRAPH_BACKEND == "memory":
+        store = get_graph_store()
+        module_index = store.module_index()
+        if module_id == UNASSIGNED_MODULE:
+            seeds = np.flatnonzero(module_index < 0)
+        else:
+            # Same selection as the Neo4j query below
+            selected = [
+                m for m in store.nodes_with_label("Module")
+                if store.ids[m] == module_id or store.ids[m].startswith(module_id + ".")
+            ]
+            seeds = np.flatnonzero(np.isin(module_index, selected))
+        nodes, edges = store.k_hop_subgraph(seeds[:max_nodes], hops, max_nodes=max_nodes)
+        return nodes, edges[: max(0, max_elements - len(nodes))]
+
+    nodes = run_read_query("""
+    MATCH (n)
+    WHERE CASE WHEN $module = $unassigned
+        THEN n.module_id IS NULL
+        ELSE n.module_id = $module OR n.module_id STARTS WITH $package END
+    RETURN ID(n) AS node_id, n.name AS name, labels(n)[0] AS label, n.layout_x AS x, n.layout_y AS y
+    LIMIT $limit
+    """, {
+        "module": module_id,
+        "package": module_id + ".",
+        "unassigned": UNASSIGNED_MODULE,
+        "limit": max_nodes,
+    })
+    node_ids = {n["node_id"] for n in nodes}
+    frontier = list(node_ids)
+    for _ in range(hops):
+        remaining = max_nodes - len(node_ids)
+        if not frontier or remaining <= 0:
+            break
+        reached = run_read_query("""
+        MATCH (n)--(m)
+        WHERE ID(n) IN $frontier AND NOT ID(m) IN $known
+        RETURN DISTINCT ID(m) AS node_id, m.name AS name, labels(m)[0] AS label,
+            m.layout_x AS x, m.layout_y AS y
+        LIMIT $limit
+        """, {"frontier": frontier, "known": list(node_ids), "limit": remaining})
+        nodes.extend(reached)
+        frontier = [n["node_id"] for n in reached]
+        node_ids.update(frontier)
+
+    edges = run_read_query("""
+    MATCH (n)-[r]->(m)
+    WHERE ID(n) IN $ids AND ID(m) IN $ids
+    RETURN
+        ID(n) AS source_id,
+        n.name AS source_name,
+        labels(n)[0] AS source_label,
+        ID(m) AS target_id,
+        m.name AS target_name,
+        labels(m)[0] AS target_label,
+        type(r) AS relation
+    LIMIT $limit
+    """, {"ids": list(node_ids), "limit": max(0, max_elements - len(nodes))})
+    return nodes, edges
+
+
+def get_layout_options(nodes, key="node_id"):
+    """
+    pyvis node options placing the nodes at their precomputed layout, and
+    whether every node has one so the physics simulation can be skipped
+    """
+    positions = {}
+    for node in nodes:
+        if node.get("x") is None or node.get("y") is None:
+            return {}, False
+        positions[node[key]] = {
+            "x": node["x"], "y": node["y"], "physics": False
+        }
+    return positions, True
+
+
+def build_overview_graph(nodes, edges):
+    """pyvis graph of the module overview, sized by members and weights"""
+    net = Network(height="500px", width="100%", bgcolor="#1a1a1a", font_color="white", directed=True)
+    color_map = get_color_map("parsed_code")
+    layout, has_layout = get_layout_options(nodes, key="id")
+    if has_layout:
+        net.toggle_physics(False)
+    largest = max((n["size"] for n in nodes), default=1) or 1
+    for node in nodes:
+        net.add_node(
+            node["id"],
+            label=node["name"],
+            title=f"Type: {node['label']}<br/>Members: {node['size']}",
+            color=color_map.get(node["label"], color_map.get("Module")),
+            size=10 + 30 * node["size"] / largest,
+            **layout.get(node["id"], {}),
+        )
+    heaviest = max((e["weight"] for e in edges), default=1) or 1
+    for edge in edges:
+        net.add_edge(
+            edge["source"],
+            edge["target"],
+            label=edge["relation"],
+            title=f"{edge['weight']} {edge['relation']} relationships",
+            width=1 + 5 * edge["weight"] / heaviest,
+            color="#888",
+        )
+    return net
+
+
+def build_network_graph(data, all_nodes=None):
     net = Network( height="500px",width="100%", bgcolor="#1a1a1a", font_color="white", directed=True)
     added_nodes = set()
-    all_nodes=fetch_all_nodes()
+    if all_nodes is None:
+        all_nodes=fetch_all_nodes()
+
+    color_map = get_color_map("parsed_code")
+
+    # Precomputed positions make the browser-side physics unnecessary
+    layout, has_layout = get_layout_options(all_nodes)
+    if has_layout:
+        net.toggle_physics(False)
 
     for record in data:
         src_id = record['source_id']
@@ -64,11 +361,11 @@ def build_network_graph(data):
         relation = record['relation']
         
         if src_id not in added_nodes:
-            net.add_node(src_id, label=src_name, title=f"Type: {src_label}", color=get_color_map("parsed_code").get(src_label))
+            net.add_node(src_id, label=src_name, title=f"Type: {src_label}", color=color_map.get(src_label), **layout.get(src_id, {}))
             added_nodes.add(src_id)
             
         if tgt_id not in added_nodes:
-            net.add_node(tgt_id, label=tgt_name, title=f"Type: {tgt_label}", color=get_color_map("parsed_code").get(tgt_label))
+            net.add_node(tgt_id, label=tgt_name, title=f"Type: {tgt_label}", color=color_map.get(tgt_label), **layout.get(tgt_id, {}))
             added_nodes.add(tgt_id)
             
         net.add_edge(src_id, tgt_id, label=relation, color="#888")
@@ -76,7 +373,7 @@ def build_network_graph(data):
     if len(all_nodes)!=len(added_nodes):
         for node in all_nodes:
             if node["node_id"] not in added_nodes:
-                net.add_node(node["node_id"], label=node["name"], title=f"Type: {node['label']}", color=get_color_map("parsed_code").get(node['label']))
+                net.add_node(node["node_id"], label=node["name"], title=f"Type: {node['label']}", color=color_map.get(node['label']), **layout.get(node["node_id"], {}))
                 added_nodes.add(node["node_id"])
                 
     return net
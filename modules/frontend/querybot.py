@@ -20,6 +20,8 @@ def show_query_results(results):
     
     if not results:
         return net
+
+    color_map = get_color_map("parsed_code")
     
     def add_node_from_data(node_data, added_nodes, net):
         """Helper function to add a node to the network"""
@@ -43,7 +45,7 @@ def show_query_results(results):
                 node_id, 
                 label=node_name, 
                 title=title, 
-                color=get_color_map("parsed_code").get(node_type, "#888888")
+                color=color_map.get(node_type, "#888888")
             )
             added_nodes.add(node_id)
         
@@ -1,37 +1,71 @@
+import colorsys
 import json
+import os
+import threading
 
+from modules.utils.graph_version import get_graph_version
 
-def get_color_map(filename):
+COLOURS = [
+    "#1f75fe",
+    "#ff6f61",
+    "#bada55",
+    "#7fffd4",
+    "#8a2be2",
+    "#e0115f",
+    "#ffb6c1",
+    "#228b22",
+    "#00ced1",
+    "#ffa07a",
+    "#20b2aa",
+    "#dc143c",
+    "#9932cc",
+    "#3cb371",
+    "#ff8c00",
+]
+
+_color_maps = {}
+_color_maps_lock = threading.Lock()
+
+
+def get_colour(index):
+    """
+    Colour of the index-th node type: the fixed palette first, then hues
+    spaced by the golden ratio so any number of types stay distinguishable
+    """
+    if index < len(COLOURS):
+        return COLOURS[index]
+    hue = ((index - len(COLOURS)) * 0.618033988749895) % 1.0
+    r, g, b = colorsys.hls_to_rgb(hue, 0.6, 0.75)
+    return "#{:02x}{:02x}{:02x}".format(int(r * 255), int(g * 255), int(b * 255))
+
+
+def build_color_map(filename):
     with open(f"outputs/{filename}.json", "r") as file:
         data = json.load(file)
-        nodes = data["nodes"]
-        nodes_type = set()
-        for node in nodes:
-            nodes_type.add(node["type"])
-
-    colours = [
-        "#1f75fe",
-        "#ff6f61",
-        "#bada55",
-        "#7fffd4",
-        "#8a2be2",
-        "#e0115f",
-        "#ffb6c1",
-        "#228b22",
-        "#00ced1",
-        "#ffa07a",
-        "#20b2aa",
-        "#dc143c",
-        "#9932cc",
-        "#3cb371",
-        "#ff8c00",
-    ]
-    i = 0
-    color_map = {}
-    for node in nodes_type:
-        color_map[node] = colours[i]
-        i += 1
-    return color_map
+        nodes_type = {node["type"] for node in data["nodes"]}
+
+    # Sorted so a type keeps its colour across runs and processes
+    return {node_type: get_colour(i) for i, node_type in enumerate(sorted(nodes_type))}
+
+
+def get_color_map(filename):
+    """
+    Colour of every node type in outputs/{filename}.json
+
+    The file is only read once per graph version, so the map can be looked
+    up for every rendered node.
+    """
+    path = f"outputs/{filename}.json"
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    key = (get_graph_version(), mtime)
+    with _color_maps_lock:
+        cached = _color_maps.get(filename)
+        if cached is None or cached[0] != key:
+            _color_maps[filename] = (key, build_color_map(filename))
+        return _color_maps[filename][1]
 
 
 {
@@ -1,4 +1,6 @@
 import os
+import json
+import urllib.request
 from datetime import datetime
 from langchain_ollama import ChatOllama
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -6,7 +8,16 @@ from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain_experimental.graph_transformers import LLMGraphTransformer
 from dotenv import load_dotenv
-from modules.config.config import ALLOWED_NODES, ALLOWED_RELATIONSHIPS, get_enhanced_prompt
+from modules.config.config import (
+    ALLOWED_NODES,
+    ALLOWED_RELATIONSHIPS,
+    LLM_BACKENDS,
+    OLLAMA_MODEL,
+    OLLAMA_PROBE_TIMEOUT_SECONDS,
+    get_enhanced_prompt,
+)
+from modules.llm.scheduler import estimate_tokens
+from modules.llm.router import Backend, LLMRouter
 
 load_dotenv(override=True)
 
@@ -20,7 +31,7 @@ def initialize_gemma_llm():
     try:
         print("Initializing local Gemma model via Ollama...")
         llm = ChatOllama(
-            model="gemma3n:latest", 
+            model=OLLAMA_MODEL,
             temperature=0,
             top_p=0.5,
         )
@@ -32,6 +43,33 @@ def initialize_gemma_llm():
         return None
 
 
+def is_ollama_available(model=OLLAMA_MODEL, timeout=OLLAMA_PROBE_TIMEOUT_SECONDS):
+    """
+    Check that the Ollama server answers and has the model pulled
+
+    ChatOllama connects lazily, so without this probe an unreachable
+    server would only surface as failed extraction requests.
+
+    Returns:
+        bool: True if the model can be used
+    """
+    base_url = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+    if "://" not in base_url:
+        base_url = f"http://{base_url}"
+    try:
+        with urllib.request.urlopen(f"{base_url.rstrip('/')}/api/tags", timeout=timeout) as response:
+            models = json.load(response).get("models", [])
+    except (OSError, ValueError) as e:
+        print(f"Ollama is not reachable at {base_url}: {e}")
+        return False
+
+    names = {m.get("name") for m in models} | {m.get("model") for m in models}
+    if model not in names:
+        print(f"Ollama model {model} is not pulled (run: ollama pull {model})")
+        return False
+    return True
+
+
 def initialize_gemini_llm():
     try:
         print("Initializing Google Gemini model...")
@@ -100,20 +138,112 @@ def create_graph_transformer(llm, use_enhanced_prompt=True):
     return transformer
 
 
+def get_model_name(llm):
+    """
+    Get the model name of an initialized LLM instance
+
+    Args:
+        llm: Initialized LLM instance
+
+    Returns:
+        str: Model name, or the class name if the LLM does not expose one
+    """
+    for attr in ("model", "model_name"):
+        value = getattr(llm, attr, None)
+        if value:
+            return str(value)
+    return type(llm).__name__
+
+
+def get_provider_name(llm):
+    """
+    Get the provider of an initialized LLM instance, as keyed in LLM_RATE_LIMITS
+
+    Args:
+        llm: Initialized LLM instance
+
+    Returns:
+        str: "gemini", "openai", "ollama", or the class name for other LLMs
+    """
+    providers = {
+        ChatGoogleGenerativeAI: "gemini",
+        ChatOpenAI: "openai",
+        ChatOllama: "ollama",
+    }
+    for llm_class, provider in providers.items():
+        if isinstance(llm, llm_class):
+            return provider
+    return type(llm).__name__
+
+
+# Backends are only initialized when their availability check passes:
+# an API key that is set, or a reachable local server
+BACKEND_INITIALIZERS = {
+    "gemini": (initialize_gemini_llm, lambda: bool(os.getenv("GOOGLE_API_KEY")), "GOOGLE_API_KEY is not set"),
+    "openai": (initialize_openai_llm, lambda: bool(os.getenv("OPENAI_API_KEY")), "OPENAI_API_KEY is not set"),
+    "ollama": (initialize_gemma_llm, is_ollama_available, "Ollama is not available"),
+}
+
+
+def get_configured_model_name(backend_names=LLM_BACKENDS):
+    """
+    Name of the configured extraction models, whether or not they are
+    reachable right now
+
+    Returns:
+        str: Model names of the backends joined with '+'
+    """
+    models = {
+        "gemini": os.getenv("GEMINI_MODEL"),
+        "openai": os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"),
+        "ollama": OLLAMA_MODEL,
+    }
+    return "+".join(str(models[backend_name]) for backend_name in backend_names)
+
+
+def initialize_backends(backend_names=LLM_BACKENDS):
+    """
+    Initialize every configured backend that is available
+
+    Args:
+        backend_names (list): Keys of BACKEND_INITIALIZERS, in order of preference
+
+    Returns:
+        list: Backend instances for the LLMs that initialized
+    """
+    backends = []
+    for backend_name in backend_names:
+        initialize, is_available, reason = BACKEND_INITIALIZERS[backend_name]
+        if not is_available():
+            print(f"Skipping {backend_name}: {reason}")
+            continue
+        llm = initialize()
+        if llm is not None:
+            backends.append(
+                Backend(get_model_name(llm), get_provider_name(llm), create_graph_transformer(llm))
+            )
+    return backends
+
+
 def get_default_llm_and_transformer():
     """
     Get default LLM and transformer setup
-    
+
     Returns:
-        tuple: (llm, transformer) or (None, None) if setup fails
+        tuple: (llm, transformer) or (None, None) if setup fails; both are
+            the LLMRouter over every available backend, which exposes the
+            combined model name and convert_to_graph_documents
     """
-    # Try Gemini first, fallback to Gemma
-    llm = initialize_gemini_llm()
-    if llm is None:
-        llm = initialize_gemma_llm()
-    
-    if llm is None:
+    backends = initialize_backends()
+    if not backends:
         return None, None
-    
-    transformer = create_graph_transformer(llm)
-    return llm, transformer 
+
+    print(f"LLM backends: {', '.join(b.name for b in backends)}")
+    # Extraction results are cached per configured backend set, so a
+    # backend that is down at startup does not turn every lookup into a miss
+    router = LLMRouter(
+        backends,
+        prompt_tokens=estimate_tokens(get_enhanced_prompt(datetime.now().isoformat())),
+        model=get_configured_model_name(),
+    )
+    return router, router
@@ -0,0 +1,171 @@
+"""
+Routing of LLM extraction requests across several providers
+
+The router keeps one graph transformer per configured backend and sends
+each request to a backend with quota headroom, chosen at random weighted by
+its observed latency and error rate, so throughput adds up across provider
+quotas. A failed request fails over to the next backend right away. Once
+every backend has failed it, the request is retried with backoff on the
+backend whose cooldown and quota free up first. Backends that keep failing
+cool down before they are tried again.
+"""
+
+import random
+import threading
+import time
+
+from modules.llm.scheduler import llm_scheduler, estimate_tokens
+
+# Weight of the newest observation in the latency and error rate averages
+SMOOTHING = 0.2
+# How much a 100% error rate divides a backend's share of the requests
+ERROR_PENALTY = 4
+MAX_COOLDOWN_SECONDS = 60
+
+
+class Backend:
+    """
+    One LLM behind the router
+
+    Attributes:
+        name (str): Model name, used in logs and cache keys
+        provider (str): Provider, a key of LLM_RATE_LIMITS
+        transformer: LLMGraphTransformer of the backend's LLM
+        latency (float): Average seconds per request, None until measured
+        error_rate (float): Average fraction of failed requests
+    """
+
+    def __init__(self, name, provider, transformer):
+        self.name = name
+        self.provider = provider
+        self.transformer = transformer
+        self.latency = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def record_success(self, latency):
+        self.requests += 1
+        self.latency = latency if self.latency is None else (
+            SMOOTHING * latency + (1 - SMOOTHING) * self.latency
+        )
+        self.error_rate *= 1 - SMOOTHING
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.requests += 1
+        self.failures += 1
+        self.error_rate = SMOOTHING + (1 - SMOOTHING) * self.error_rate
+        self.consecutive_failures += 1
+        self.cooldown_until = time.monotonic() + min(
+            MAX_COOLDOWN_SECONDS, 2 ** self.consecutive_failures
+        )
+
+
+class LLMRouter:
+    """
+    Drop-in replacement for a single graph transformer that spreads
+    convert_to_graph_documents calls across backends
+
+    Args:
+        backends (list): Backend instances, in order of preference
+        prompt_tokens (int): Estimated tokens of the prompt template, added
+            to every request
+        model (str): Name extraction results are cached under; should name
+            the configured backends rather than the ones that initialized,
+            so an unreachable backend does not invalidate the cache
+    """
+
+    def __init__(self, backends, prompt_tokens=0, scheduler=llm_scheduler, model=None):
+        self.backends = backends
+        self.prompt_tokens = prompt_tokens
+        self.scheduler = scheduler
+        self._model = model
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self._model or "+".join(backend.name for backend in self.backends)
+
+    def get_weight(self, backend, default_latency):
+        latency = backend.latency if backend.latency is not None else default_latency
+        return 1 / (max(latency, 0.01) * (1 + ERROR_PENALTY * backend.error_rate))
+
+    def choose(self, tokens, exclude):
+        """
+        Pick the backend for a request
+
+        Backends that can admit the request now and are not cooling down
+        are drawn weighted by speed and reliability; untried backends count
+        as fast as the fastest known one so they get measured. Without any
+        such backend, the one that frees up first is used.
+        """
+        candidates = [b for b in self.backends if b not in exclude]
+        now = time.monotonic()
+        with self._lock:
+            known = [b.latency for b in candidates if b.latency is not None]
+            default_latency = min(known) if known else 1.0
+            waits = {
+                b: max(
+                    self.scheduler.get_limiter(b.provider).get_wait(tokens),
+                    b.cooldown_until - now,
+                )
+                for b in candidates
+            }
+            ready = [b for b in candidates if waits[b] <= 0]
+            if not ready:
+                return min(candidates, key=lambda b: waits[b])
+            weights = [self.get_weight(b, default_latency) for b in ready]
+            return random.choices(ready, weights=weights)[0]
+
+    def convert_to_graph_documents(self, documents):
+        tokens = self.prompt_tokens + sum(estimate_tokens(d.page_content) for d in documents)
+        tried = []
+        while True:
+            # Every backend gets one attempt before any is retried
+            last_attempt = len(tried) == len(self.backends) or len(self.backends) == 1
+            backend = self.choose(tokens, [] if last_attempt else tried)
+            tried.append(backend)
+            if last_attempt:
+                time.sleep(max(0.0, backend.cooldown_until - time.monotonic()))
+            timing = {}
+
+            def request():
+                # Time the call only, not the wait for quota
+                started = time.perf_counter()
+                graph_docs = backend.transformer.convert_to_graph_documents(documents)
+                timing["latency"] = time.perf_counter() - started
+                return graph_docs
+
+            try:
+                result = self.scheduler.run(
+                    backend.provider,
+                    tokens,
+                    request,
+                    # Fail over at once while other backends are left
+                    max_retries=None if last_attempt else 0,
+                )
+            except Exception as e:
+                with self._lock:
+                    backend.record_failure()
+                if last_attempt:
+                    raise
+                print(f"⚠️ {backend.name} failed ({type(e).__name__}), failing over")
+                continue
+            with self._lock:
+                backend.record_success(timing["latency"])
+            return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                backend.name: {
+                    "requests": backend.requests,
+                    "failures": backend.failures,
+                    "latency": backend.latency,
+                    "error_rate": backend.error_rate,
+                }
+                for backend in self.backends
+            }
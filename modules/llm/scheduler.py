@@ -0,0 +1,223 @@
+"""
+Rate-limit-aware scheduling of LLM extraction requests
+
+Every request to a provider first reserves room in a sliding one-minute
+window of requests and estimated tokens, so concurrent extraction queues up
+under the provider quota instead of running into it. Transient failures
+(rate limits, timeouts, 5xx) are retried with full-jitter exponential
+backoff; a rate limit also halves the provider's effective quota and pauses
+all of its requests, and the quota grows back with every success. A request
+that still fails after LLM_MAX_RETRIES raises, so the file it belongs to is
+reported as failed instead of being saved with a partial graph.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+
+from modules.config.config import (
+    LLM_RATE_LIMITS,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+)
+
+WINDOW_SECONDS = 60
+CHARS_PER_TOKEN = 4
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+RATE_LIMIT_MARKERS = ("429", "rate limit", "ratelimit", "resourceexhausted", "resource exhausted", "quota")
+TRANSIENT_MARKERS = RATE_LIMIT_MARKERS + (
+    "timeout", "timed out", "deadline", "unavailable", "overloaded", "connection", "temporarily",
+)
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def get_status_code(error):
+    for source in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "code", "status"):
+            value = getattr(source, attr, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def describe_error(error):
+    return f"{type(error).__name__} {error}".lower()
+
+
+def is_rate_limit_error(error):
+    return get_status_code(error) == 429 or any(m in describe_error(error) for m in RATE_LIMIT_MARKERS)
+
+
+def is_transient_error(error):
+    if get_status_code(error) in TRANSIENT_STATUS_CODES:
+        return True
+    return any(m in describe_error(error) for m in TRANSIENT_MARKERS)
+
+
+def get_backoff_delay(attempt, base=LLM_BACKOFF_BASE_SECONDS, cap=LLM_BACKOFF_MAX_SECONDS):
+    """Full jitter: a random delay up to the capped exponential backoff"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class ProviderRateLimiter:
+    """
+    Sliding-window request and token budget of one provider
+
+    Args:
+        requests_per_minute (int): Request quota, None for no limit
+        tokens_per_minute (int): Token quota, None for no limit
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        # Fraction of the quota currently used, lowered on rate limit errors
+        self.scale = 1.0
+        self.paused_until = 0.0
+        self.window = deque()
+        self.window_tokens = 0
+        self._lock = threading.Lock()
+
+    def _limit(self, quota):
+        return None if quota is None else max(1, int(quota * self.scale))
+
+    def _expire(self, now):
+        while self.window and self.window[0][0] <= now - WINDOW_SECONDS:
+            _, tokens = self.window.popleft()
+            self.window_tokens -= tokens
+
+    def _get_wait(self, tokens, now):
+        """Seconds until the request fits, 0 if it fits now"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        request_limit = self._limit(self.requests_per_minute)
+        token_limit = self._limit(self.tokens_per_minute)
+        fits_requests = request_limit is None or len(self.window) < request_limit
+        # A request larger than the whole token quota still runs alone
+        fits_tokens = (
+            token_limit is None
+            or not self.window
+            or self.window_tokens + tokens <= token_limit
+        )
+        if fits_requests and fits_tokens:
+            return 0
+        return max(0.01, self.window[0][0] + WINDOW_SECONDS - now)
+
+    def acquire(self, tokens):
+        """Block until the request fits in the window, then record it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._get_wait(tokens, now)
+                if wait == 0:
+                    self.window.append((now, tokens))
+                    self.window_tokens += tokens
+                    return
+            time.sleep(wait)
+
+    def get_wait(self, tokens):
+        """Seconds until a request of this size would be admitted"""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            return self._get_wait(tokens, now)
+
+    def record_success(self):
+        with self._lock:
+            self.scale = min(1.0, self.scale + 0.05)
+
+    def record_rate_limit(self, delay):
+        with self._lock:
+            self.scale = max(0.1, self.scale / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                "requests_in_window": len(self.window),
+                "tokens_in_window": self.window_tokens,
+                "quota_scale": self.scale,
+            }
+
+
+class LLMScheduler:
+    """Runs LLM requests under the rate limits of their provider"""
+
+    def __init__(self, limits=LLM_RATE_LIMITS, max_retries=LLM_MAX_RETRIES):
+        self.limits = limits
+        self.max_retries = max_retries
+        self.limiters = {}
+        self.retries = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def get_limiter(self, provider):
+        with self._lock:
+            if provider not in self.limiters:
+                limits = self.limits.get(provider) or {}
+                self.limiters[provider] = ProviderRateLimiter(
+                    limits.get("requests_per_minute"), limits.get("tokens_per_minute")
+                )
+            return self.limiters[provider]
+
+    def run(self, provider, tokens, request, max_retries=None):
+        """
+        Run request() once the provider has room for it, retrying
+        transient failures
+
+        Args:
+            provider (str): Provider name, a key of LLM_RATE_LIMITS
+            tokens (int): Estimated tokens of the request
+            request (callable): Sends the request and returns its result
+            max_retries (int): Overrides LLM_MAX_RETRIES for this request
+
+        Returns:
+            The result of request()
+
+        Raises:
+            Exception: The last error once retries are exhausted, or the
+                first non-transient error
+        """
+        limiter = self.get_limiter(provider)
+        max_retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(max_retries + 1):
+            limiter.acquire(tokens)
+            try:
+                result = request()
+            except Exception as e:
+                delay = get_backoff_delay(attempt)
+                if is_rate_limit_error(e):
+                    limiter.record_rate_limit(delay)
+                if not is_transient_error(e) or attempt == max_retries:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                with self._lock:
+                    self.retries += 1
+                print(
+                    f"⚠️ {provider} request failed ({type(e).__name__}), "
+                    f"retrying in {delay:.1f}s ({attempt + 1}/{max_retries})"
+                )
+                time.sleep(delay)
+            else:
+                limiter.record_success()
+                return result
+
+    def stats(self):
+        with self._lock:
+            limiters = dict(self.limiters)
+            stats = {"retries": self.retries, "failures": self.failures}
+        stats["providers"] = {p: limiter.stats() for p, limiter in limiters.items()}
+        return stats
+
+
+# Shared by every extraction thread of this process
+llm_scheduler = LLMScheduler()
+
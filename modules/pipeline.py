@@ -1,24 +1,188 @@
-from modules.utils.files_from_dir import get_files_from_dir
+import os
+import itertools
+from modules.config.config import (
+    INCREMENTAL_INGESTION,
+    EXTRACTION_MODE,
+    STREAMING_INGESTION,
+    DERIVED_INDEXES,
+    GRAPH_LAYOUT,
+    GRAPH_SNAPSHOT,
+    GRAPH_BACKEND,
+)
+from modules.utils.files_from_dir import collect_files, parse_files, stream_files
 import modules.utils.neo4j_functions as neo4j_functions
-from modules.utils.file_utils import clear_directory
+from modules.utils.graph_version import bump_graph_version
+from modules.utils.graph_indexes import saving_derived_indexes_to_neo4j, computing_derived_indexes
+from modules.utils.graph_layout import saving_layout_to_neo4j, computing_layout
+from modules.utils.graph_snapshot import write_graph_snapshot
+from modules.utils.file_utils import (
+    clear_directory,
+    delete_file_content,
+    build_file_manifest,
+    load_file_manifest,
+    save_file_manifest,
+    diff_file_manifests,
+    remove_files_from_json,
+    clear_results_log,
+    compact_results_log,
+)
 
+PARSED_CODE_FILE = os.path.join("outputs", "parsed_code.json")
 
-def ingestion_pipeline(directories: list[str], file_extension: str):
+
+def streaming_ingestion(file_paths, extraction_mode, root_dirs, replace_graph=False):
+    """
+    Extract files and write their records to Neo4j in one pass
+
+    Records flow walk → extract → normalize → batched writes through
+    bounded buffers, so Neo4j writes start with the first files and file
+    records do not pile up in memory (the writer keeps node keys, and
+    compacting the parsed JSON afterwards loads the whole graph index).
+
+    Args:
+        replace_graph (bool): Delete the existing graph before the first
+            record is written; if no file could be extracted the existing
+            graph is kept
+    """
+    clear_results_log(PARSED_CODE_FILE)
+    records = stream_files(file_paths, mode=extraction_mode, root_dirs=root_dirs)
+    first_record = next(records, None)
+    if first_record is None:
+        print("No file could be extracted, leaving Neo4j unchanged")
+        compact_results_log(PARSED_CODE_FILE)
+        return []
+
+    if replace_graph:
+        neo4j_functions.deleting_all_nodes_and_relationships()
+    parsed_files = neo4j_functions.saving_records_to_neo4j(
+        itertools.chain([first_record], records)
+    )
+    compact_results_log(PARSED_CODE_FILE)
+    return parsed_files
+
+
+def full_ingestion(file_paths, extraction_mode, root_dirs, streaming=STREAMING_INGESTION, use_neo4j=True):
+    print("Getting and parsing files from directories...")
+
+    delete_file_content(PARSED_CODE_FILE)
+
+    if not use_neo4j:
+        # The in-memory backend is built from the parsed JSON alone
+        return parse_files(file_paths, mode=extraction_mode, root_dirs=root_dirs)
+
+    if streaming:
+        print("Streaming nodes and relationships to Neo4j...")
+        return streaming_ingestion(file_paths, extraction_mode, root_dirs, replace_graph=True)
+
+    parsed_files = parse_files(file_paths, mode=extraction_mode, root_dirs=root_dirs)
+
+    print("Saving nodes and relationships to Neo4j...")
+
+    neo4j_functions.deleting_all_nodes_and_relationships()
+    neo4j_functions.saving_nodes_to_neo4j(PARSED_CODE_FILE)
+    neo4j_functions.saving_relationships_to_neo4j(PARSED_CODE_FILE)
+
+    return parsed_files
+
+
+def incremental_ingestion(previous_manifest, manifest, extraction_mode, root_dirs, streaming=STREAMING_INGESTION, use_neo4j=True):
+    added, changed, deleted = diff_file_manifests(previous_manifest, manifest)
+    print(
+        f"Incremental ingestion: {len(added)} added, {len(changed)} changed, {len(deleted)} deleted files"
+    )
+
+    stale_files = changed + deleted
+    remove_files_from_json(stale_files, PARSED_CODE_FILE)
+
+    if not use_neo4j:
+        print("Getting and parsing changed files...")
+        parsed_files = parse_files(added + changed, mode=extraction_mode, root_dirs=root_dirs)
+    elif streaming:
+        print("Streaming changed files into Neo4j...")
+
+        # Stale provenance is stripped before the new records are written,
+        # since they share provenance with the records being replaced
+        neo4j_functions.detaching_files_from_graph(stale_files)
+        parsed_files = streaming_ingestion(added + changed, extraction_mode, root_dirs)
+    else:
+        print("Getting and parsing changed files...")
+
+        parsed_files = parse_files(added + changed, mode=extraction_mode, root_dirs=root_dirs)
+
+        print("Patching nodes and relationships in Neo4j...")
+
+        # Provenance is stripped first and orphans are deleted last, so the
+        # records of unchanged files stay queryable throughout the update
+        neo4j_functions.detaching_files_from_graph(stale_files)
+        if parsed_files:
+            neo4j_functions.saving_nodes_to_neo4j(PARSED_CODE_FILE, only_files=parsed_files)
+            neo4j_functions.saving_relationships_to_neo4j(PARSED_CODE_FILE, only_files=parsed_files)
+
+    if use_neo4j:
+        neo4j_functions.deleting_orphaned_nodes_and_relationships()
+
+    unchanged_files = set(manifest) - set(added) - set(changed)
+    return sorted(unchanged_files) + parsed_files
+
+
+def ingestion_pipeline(
+    directories: list[str],
+    file_extension: str,
+    incremental: bool = INCREMENTAL_INGESTION,
+    extraction_mode: str = EXTRACTION_MODE,
+):
     directories = directories
     file_extension = f".{file_extension}"
 
     print("Starting the pipeline...")
 
-    print("Getting and parsingfiles from directories...")
+    file_paths = collect_files(directories, file_extension)
+    manifest = build_file_manifest(file_paths)
+    previous_manifest = load_file_manifest()
 
-    get_files_from_dir(directories, file_extension)
+    can_patch = (
+        previous_manifest is not None
+        and os.path.exists(PARSED_CODE_FILE)
+        and os.path.getsize(PARSED_CODE_FILE) > 0
+    )
+    # With the in-memory backend nothing is written to Neo4j, so a dev box
+    # needs no database service
+    use_neo4j = GRAPH_BACKEND != "memory"
+    if incremental and can_patch:
+        ingested_files = incremental_ingestion(
+            previous_manifest, manifest, extraction_mode, directories, use_neo4j=use_neo4j
+        )
+    else:
+        ingested_files = full_ingestion(file_paths, extraction_mode, directories, use_neo4j=use_neo4j)
 
-    print("Saving nodes and relationships to Neo4j...")
+    # Only successfully ingested files are recorded, so failed files are
+    # picked up again by the next incremental run
+    save_file_manifest({f: manifest[f] for f in ingested_files if f in manifest})
 
-    neo4j_functions.deleting_all_nodes_and_relationships()
-    neo4j_functions.saving_nodes_to_neo4j("outputs/parsed_code.json")
-    neo4j_functions.saving_relationships_to_neo4j("outputs/parsed_code.json")
-    neo4j_functions.close_driver()
+    # Derived indexes and the layout go to Neo4j, and otherwise only to
+    # the snapshot and GRAPH_LAYOUT_FILE the in-memory backend reads
+    derived = None
+    if DERIVED_INDEXES:
+        print("Computing derived graph indexes...")
+        if use_neo4j:
+            derived = saving_derived_indexes_to_neo4j(PARSED_CODE_FILE)
+        else:
+            computed = computing_derived_indexes(PARSED_CODE_FILE)
+            derived = computed[1] if computed else None
+
+    if GRAPH_LAYOUT:
+        print("Computing the graph layout...")
+        if use_neo4j:
+            saving_layout_to_neo4j(PARSED_CODE_FILE)
+        else:
+            computing_layout(PARSED_CODE_FILE)
+
+    if GRAPH_SNAPSHOT:
+        print("Writing the analytics snapshot...")
+        write_graph_snapshot(PARSED_CODE_FILE, derived=derived)
+
+    # Readers holding a schema or results snapshot refresh on the next request
+    bump_graph_version()
 
     print("Ingestion Pipeline completed.")
 
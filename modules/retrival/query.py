@@ -1,10 +1,18 @@
 import os
+import asyncio
+import contextvars
+import threading
 from dotenv import load_dotenv
 from langchain_neo4j import Neo4jGraph
 from langchain_google_genai import GoogleGenerativeAI
 from langchain_neo4j.chains.graph_qa.cypher import GraphCypherQAChain
 from langchain_core.prompts import PromptTemplate
-from modules.retrival.database import get_schema_from_neo4j
+from modules.config.config import QUERY_TOP_K, QUERY_STREAM_BATCH_SIZE
+from modules.retrival.semantic_cache import SemanticQueryCache
+from modules.retrival.result_cache import query_result_cache
+from modules.utils.graph_version import get_graph_version
+from modules.utils.neo4j_functions import get_driver
+from modules.utils.neo4j_async import run_async, read_query
 
 load_dotenv(override=True)
 
@@ -23,6 +31,13 @@ def get_cypher_prompt():
             2. DO NOT rename or change the variable names used in MATCH clauses (e.g., if `m` is used, keep using `m`).
             3. DO NOT reformat or simplify the Cypher query. Keep its original structure and field names exactly the same.
             4. Only return the Cypher query. No explanation or comments.
+            5. For transitive questions (everything reachable from X, who transitively calls or imports Y) do NOT use
+               variable-length paths. Use the precomputed reachability labels instead: a node a reaches a node b through
+               calls when any(i IN range(0, size(a.call_reach) - 1, 2) WHERE a.call_reach[i] <= b.call_post AND b.call_post <= a.call_reach[i + 1]),
+               and through imports likewise with import_reach and import_post. Every node matches its own labels, so
+               add a <> b unless the node itself should be counted.
+            6. Use call_fan_in, call_fan_out, import_fan_in, import_fan_out, import_layer, call_scc and module_id node
+               properties directly for degree, layering, cycle and containing-module questions.
 
             Now generate the Cypher query to answer:
             {question}
@@ -30,9 +45,72 @@ def get_cypher_prompt():
     return PromptTemplate(template=templete, input_variables=["schema", "question"])
 
 
+# Set around a chain call to {"limit": n, "rows": None}: the graph query the
+# chain makes then pulls at most n rows and leaves them in "rows"
+query_capture = contextvars.ContextVar("query_capture", default=None)
+
+
+class CachedNeo4jGraph(Neo4jGraph):
+    """
+    Neo4jGraph that runs on the shared driver pool and whose read queries go
+    through the shared result cache
+    """
+
+    @property
+    def _driver(self):
+        return get_driver()
+
+    @_driver.setter
+    def _driver(self, driver):
+        # Neo4jGraph.__init__ opens a driver of its own; drop it in favor of
+        # the shared pool
+        if driver is not None and driver is not get_driver():
+            driver.close()
+
+    def close(self):
+        # The shared pool outlives any one graph object
+        pass
+
+    def iter_query(self, query, params=None, limit=None, fetch_size=QUERY_STREAM_BATCH_SIZE):
+        """
+        Stream the rows of a read query instead of materializing them
+
+        Rows are pulled from the server fetch_size at a time, so callers can
+        page through large result sets, and stop early at limit rows.
+
+        Yields:
+            dict: One result row
+        """
+        # Neo4jGraph.query always materializes every row, so the stream
+        # goes through the shared driver
+        with get_driver().session(database=self._database, fetch_size=fetch_size) as session:
+            result = session.run(query, params or {})
+            for count, record in enumerate(result, start=1):
+                yield record.data()
+                if limit is not None and count >= limit:
+                    break
+
+    def query(self, query, params={}, session_params={}):
+        capture = query_capture.get()
+        if capture is None:
+            return query_result_cache.get_or_run(
+                query, params, lambda: super(CachedNeo4jGraph, self).query(query, params, session_params)
+            )
+
+        # A row limit is not a Cypher parameter, so it cannot clash with one
+        limit = capture["limit"]
+        rows = query_result_cache.get_or_run(
+            query,
+            {**params, "$row_limit": limit},
+            lambda: list(self.iter_query(query, params, limit)),
+        )
+        capture["rows"] = rows
+        return rows
+
+
 def initialize_graph():
     """Initialize and return Neo4j graph connection"""
-    graph = Neo4jGraph(
+    graph = CachedNeo4jGraph(
         url=os.getenv("NEO4J_URI"),
         username=os.getenv("NEO4J_USER"),
         password=os.getenv("NEO4J_PASSWORD"),
@@ -50,10 +128,10 @@ def initialize_llm():
     )
 
 
-def create_query_chain():
+def create_query_chain(graph=None, llm=None, top_k=QUERY_TOP_K):
     """Create and return the configured GraphCypherQAChain"""
-    graph = initialize_graph()
-    llm = initialize_llm()
+    graph = graph or initialize_graph()
+    llm = llm or initialize_llm()
     cypher_prompt = get_cypher_prompt()
 
     chain = GraphCypherQAChain.from_llm(
@@ -63,48 +141,228 @@ def create_query_chain():
         return_intermediate_steps=True,
         allow_dangerous_requests=True,
         cypher_prompt=cypher_prompt,
+        top_k=top_k,
     )
 
     return chain, graph
 
 
-def process_codebase_query(question):
+class QueryService:
     """
-    Returns:
-        dict: Dictionary containing 'answer', 'cypher_query', and 'raw_results'
+    Long-lived Query Bot backend
+
+    Holds one graph connection, one LLM client and one compiled chain across
+    questions. The schema snapshot is only refreshed when the graph version
+    changes, i.e. after an ingestion, instead of on every question.
+
+    Translations are cached per schema: a repeated question on an unchanged
+    graph is answered from the cache without any LLM call. A rephrased
+    question, or any question after an ingestion that kept the schema,
+    re-runs the cached Cypher so only the answer has to be generated.
     """
-    try:
-        chain, graph = create_query_chain()
-        schema = get_schema_from_neo4j()
-        response = chain.invoke({"query": question, "schema": schema})
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.graph = None
+        self.llm = None
+        self.chain = None
+        self.schema = None
+        self.graph_version = None
+        self.translation_cache = SemanticQueryCache()
+
+    def get_chain(self):
+        """Return the chain, rebuilding it if the graph changed since it was built"""
+        version = get_graph_version()
+        with self._lock:
+            if self.graph is None:
+                self.graph = CachedNeo4jGraph(
+                    url=os.getenv("NEO4J_URI"),
+                    username=os.getenv("NEO4J_USER"),
+                    password=os.getenv("NEO4J_PASSWORD"),
+                    refresh_schema=False,
+                )
+                self.llm = initialize_llm()
+            if self.chain is None or version != self.graph_version:
+                # The chain bakes the schema into its prompt, so it is
+                # rebuilt with the refreshed schema (no extra round trips)
+                self.graph.refresh_schema()
+                self.schema = self.graph.get_schema
+                self.chain, _ = create_query_chain(self.graph, self.llm)
+                self.graph_version = version
+                self.translation_cache.set_schema_fingerprint(self.schema)
+            return self.chain, self.graph, self.schema, self.graph_version
+
+    def invalidate(self):
+        """Force a schema refresh on the next question"""
+        with self._lock:
+            self.chain = None
+
+    async def answer_with_chain(self, chain, graph, schema, question):
+        """Translate the question to Cypher with the LLM, run it and answer"""
+        # The chain runs the query once, streaming one row past top_k so
+        # the same result set tells whether it was cut
+        capture = {"limit": chain.top_k + 1, "rows": None}
+        token = query_capture.set(capture)
+        try:
+            response = await chain.ainvoke({"query": question, "schema": schema})
+        finally:
+            query_capture.reset(token)
 
         # Extract components from response
         answer = response.get("result", "No answer found")
-        cypher_query = (
-            response["intermediate_steps"][0]["query"]
-            if response.get("intermediate_steps")
-            else None
-        )
+        steps = response.get("intermediate_steps") or []
+        cypher_query = steps[0]["query"] if steps else None
 
-        # Get raw graph results if available
+        # The chain already ran the query; its rows double as the raw
+        # results instead of running it again
         raw_results = None
+        truncated = False
         if cypher_query and not "cannot be answered" in cypher_query.lower():
-            try:
-                raw_results = graph.query(cypher_query)
-            except Exception as e:
-                raw_results = f"Error executing query: {str(e)}"
+            rows = capture["rows"]
+            if rows is not None:
+                raw_results = rows[: chain.top_k]
+                truncated = len(rows) > chain.top_k
+            else:
+                raw_results = steps[1]["context"] if len(steps) > 1 else None
 
         return {
             "answer": answer,
             "cypher_query": cypher_query,
             "raw_results": raw_results,
+            "truncated": truncated,
             "success": True,
         }
 
-    except Exception as e:
+    async def fetch_cypher_rows(self, chain, graph, cypher_query):
+        """Run a previously generated Cypher query, one row past top_k"""
+        # The extra row tells whether the result was cut
+        return await read_query(
+            cypher_query,
+            limit=chain.top_k + 1,
+            fetch_size=QUERY_STREAM_BATCH_SIZE,
+            database=graph._database,
+        )
+
+    async def answer_from_rows(self, chain, question, cypher_query, rows):
+        """Generate the answer to a question from the rows of its Cypher query"""
+        raw_results = rows[: chain.top_k]
+        answer = await chain.qa_chain.ainvoke({"question": question, "context": raw_results})
         return {
-            "answer": f"Error processing query: {str(e)}",
-            "cypher_query": None,
-            "raw_results": None,
-            "success": False,
+            "answer": answer,
+            "cypher_query": cypher_query,
+            "raw_results": raw_results,
+            "truncated": len(rows) > chain.top_k,
+            "success": True,
         }
+
+    async def answer_from_cypher(self, chain, graph, question, cypher_query):
+        """Answer with a previously generated Cypher query, skipping translation"""
+        rows = await self.fetch_cypher_rows(chain, graph, cypher_query)
+        return await self.answer_from_rows(chain, question, cypher_query, rows)
+
+    def cache_stats(self):
+        return {
+            "translations": self.translation_cache.stats(),
+            "query_results": query_result_cache.stats(),
+        }
+
+    def remember(self, question, response, version):
+        # Only translations that ran successfully are worth reusing
+        if isinstance(response["raw_results"], list):
+            self.translation_cache.put(
+                question,
+                cypher_query=response["cypher_query"],
+                response=response,
+                graph_version=version,
+            )
+
+    async def answer(self, chain, graph, schema, version, question):
+        cached = self.translation_cache.get(question)
+        # Only the very same question gets the stored answer; a rephrasing
+        # may ask for something the stored wording does not answer
+        if cached is not None and cached["exact"] and cached["graph_version"] == version:
+            return dict(cached["response"])
+        if cached is not None:
+            response = await self.answer_from_cypher(chain, graph, question, cached["cypher_query"])
+        else:
+            response = await self.answer_with_chain(chain, graph, schema, question)
+        self.remember(question, response, version)
+        return response
+
+    async def ask_async(self, question):
+        if self.chain is None or self.graph_version == get_graph_version():
+            # get_chain still reads the version file and may take the lock,
+            # so it stays off the shared event loop like on the slow path
+            chain, graph, schema, version = await asyncio.to_thread(self.get_chain)
+            return await self.answer(chain, graph, schema, version, question)
+
+        # The schema has to be fetched again. A translation cached before the
+        # ingestion only needs its Cypher re-run, which does not depend on
+        # the schema, so it starts while the schema is fetched and its rows
+        # are kept if the schema turned out unchanged. The answer prompt
+        # only runs once that is known, since an LLM call already handed to
+        # an executor cannot be cancelled
+        previous_chain, previous_graph = self.chain, self.graph
+        fingerprint = self.translation_cache.schema_fingerprint
+        cached = self.translation_cache.get(question)
+        refresh = asyncio.create_task(asyncio.to_thread(self.get_chain))
+        speculative = None
+        try:
+            if cached is not None:
+                speculative = asyncio.create_task(
+                    self.fetch_cypher_rows(previous_chain, previous_graph, cached["cypher_query"])
+                )
+
+            chain, graph, schema, version = await refresh
+            # A changed schema cleared the translation cache, so the lookup
+            # above is stale
+            if cached is not None and self.translation_cache.schema_fingerprint == fingerprint:
+                rows = await speculative
+                response = await self.answer_from_rows(chain, question, cached["cypher_query"], rows)
+            else:
+                response = await self.answer_with_chain(chain, graph, schema, question)
+            self.remember(question, response, version)
+            return response
+        finally:
+            if speculative is not None:
+                speculative.cancel()
+                # Retrieve the outcome so a failed or cancelled task is not
+                # reported as never retrieved
+                await asyncio.gather(speculative, return_exceptions=True)
+
+    def ask(self, question):
+        """
+        Returns:
+            dict: Dictionary containing 'answer', 'cypher_query', and 'raw_results'
+        """
+        try:
+            return run_async(self.ask_async(question))
+
+        except Exception as e:
+            return {
+                "answer": f"Error processing query: {str(e)}",
+                "cypher_query": None,
+                "raw_results": None,
+                "success": False,
+            }
+
+
+_query_service = None
+_query_service_lock = threading.Lock()
+
+
+def get_query_service():
+    """Return the process-wide QueryService, creating it on first use"""
+    global _query_service
+    with _query_service_lock:
+        if _query_service is None:
+            _query_service = QueryService()
+        return _query_service
+
+
+def process_codebase_query(question):
+    """
+    Returns:
+        dict: Dictionary containing 'answer', 'cypher_query', and 'raw_results'
+    """
+    return get_query_service().ask(question)
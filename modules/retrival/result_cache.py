@@ -0,0 +1,131 @@
+"""
+Result cache for read-only Cypher queries
+
+Results are keyed by the normalized Cypher text, its parameters and the
+graph version, so they stay valid until the next ingestion bumps the
+version and never need explicit invalidation. The cache is bounded by the
+approximate memory of the cached rows and evicts least recently used
+results first.
+"""
+
+import hashlib
+import json
+import pickle
+import re
+import threading
+from collections import OrderedDict
+
+from modules.config.config import QUERY_RESULT_CACHE_MAX_BYTES
+from modules.utils.graph_version import get_graph_version
+
+STRING_LITERAL = re.compile(r"""('(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*")""")
+WRITE_CLAUSE = re.compile(
+    r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV)\b", re.IGNORECASE
+)
+
+
+def normalize_cypher(cypher):
+    """Collapse whitespace outside string literals and drop a trailing semicolon"""
+    parts = STRING_LITERAL.split(cypher.strip().rstrip(";"))
+    return "".join(
+        part if i % 2 else " ".join(part.split()) for i, part in enumerate(parts)
+    )
+
+
+def is_read_only(cypher):
+    return not WRITE_CLAUSE.search(STRING_LITERAL.sub("''", cypher))
+
+
+class QueryResultCache:
+    def __init__(self, max_bytes=QUERY_RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, cypher, params, graph_version):
+        key = json.dumps(
+            [normalize_cypher(cypher), params or {}, graph_version],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def lookup(self, cypher, params):
+        """
+        Look a query up without running it
+
+        Returns:
+            tuple: (cache key, cached rows or None); the key is None for
+                queries that must not be cached
+        """
+        if not is_read_only(cypher):
+            return None, None
+
+        key = self.make_key(cypher, params, get_graph_version())
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return key, list(self.entries[key][0])
+            self.misses += 1
+        return key, None
+
+    def store(self, key, rows):
+        """Cache the rows of a query looked up under key"""
+        if key is None:
+            return
+        try:
+            size = len(pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key not in self.entries:
+                self.entries[key] = (list(rows), size)
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self.entries.popitem(last=False)
+                    self.total_bytes -= evicted_size
+
+    def get_or_run(self, cypher, params, run):
+        """
+        Return the cached rows of a query, running it on a miss
+
+        Args:
+            cypher (str): Cypher query
+            params (dict): Query parameters
+            run (callable): Executes the query and returns its rows
+
+        Returns:
+            list: Result rows
+        """
+        key, rows = self.lookup(cypher, params)
+        if rows is not None:
+            return rows
+        rows = run()
+        self.store(key, rows)
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "size_bytes": self.total_bytes,
+        }
+
+
+# Shared by the Query Bot and the dashboards of this process
+query_result_cache = QueryResultCache()
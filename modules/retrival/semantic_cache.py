@@ -0,0 +1,215 @@
+"""
+Semantic cache for natural-language to Cypher translation
+
+Questions are normalized and looked up exactly first, then by cosine
+similarity over cheap, locally computed embeddings (hashed words and
+character trigrams), so rephrasings like "show all classes" / "list every
+class" hit without an LLM call. Names mentioned in a question are never
+fuzzed: two questions only match semantically when they mention the same
+identifiers, so "what calls login" never answers "what calls logout".
+"""
+
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from modules.config.config import (
+    QUERY_CACHE_MAX_ENTRIES,
+    QUERY_CACHE_TTL_SECONDS,
+    QUERY_CACHE_SIMILARITY,
+)
+
+EMBEDDING_DIMENSIONS = 1024
+
+# Words that phrase a question rather than say what it asks for.
+# Aggregation and quantity words ("how many", "count", "total", "most")
+# change the query, so they are deliberately not listed here or in
+# CODE_WORDS and have to match exactly like names
+PHRASING_WORDS = {
+    "a", "about", "all", "an", "and", "any", "are", "as", "can", "code",
+    "codebase", "display", "do", "does", "each", "every", "find",
+    "for", "get", "give", "has", "have", "i", "in", "inside", "is",
+    "it", "list", "me", "on", "or", "please",
+    "project", "show", "tell", "that", "the", "their", "them", "there",
+    "these", "this", "those", "what", "whats", "where",
+    "which", "who", "whom", "with", "within",
+}
+
+# Words about code structure or direction; they carry meaning but name
+# nothing, and are compared after stemming
+CODE_WORDS = {
+    "by", "of", "to", "attribute", "attributes", "call", "called", "calling", "calls", "class",
+    "classes", "constant", "constants", "contain", "contains", "define",
+    "defined", "defines", "depend", "depends", "file", "files", "from",
+    "function", "functions", "import", "imported", "imports", "inherit",
+    "inherits", "instantiate", "instantiates", "method", "methods", "module",
+    "modules", "node", "nodes", "relationship", "relationships",
+    "return", "returns", "use", "used", "uses", "variable", "variables",
+}
+
+
+def stem(word):
+    """Naive suffix stripping so 'calls', 'calling' and 'called' embed alike"""
+    for suffix in ("ing", "es", "ed", "s"):
+        # 'class' is not a plural, while 'classes' stems to it
+        if suffix == "s" and word.endswith("ss"):
+            break
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+CODE_STEMS = {stem(word) for word in CODE_WORDS}
+
+
+def normalize_question(question):
+    """Lowercase, strip punctuation and collapse whitespace"""
+    words = re.findall(r"[\w.]+", question.lower())
+    return " ".join(word.strip(".") for word in words if word.strip("."))
+
+
+def get_question_names(normalized):
+    """Words that name something in the codebase and must match exactly"""
+    return frozenset(
+        w for w in normalized.split()
+        if w not in PHRASING_WORDS and stem(w) not in CODE_STEMS
+    )
+
+
+def embed_question(normalized):
+    """
+    Embed a normalized question as a sparse, L2-normalized vector
+
+    Phrasing words are dropped, then the remaining words are stemmed and
+    hashed together with word bigrams (so "X calls Y" differs from "Y calls
+    X") and character trigrams, which is enough to match rephrasings of the
+    same question without an embedding model.
+    """
+    words = [stem(w) for w in normalized.split() if w not in PHRASING_WORDS]
+    features = ["w:" + word for word in words]
+    features.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+    padded = f" {' '.join(words)} "
+    features.extend("c:" + padded[i:i + 3] for i in range(len(padded) - 2))
+
+    vector = {}
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=4).digest()
+        index = int.from_bytes(digest, "little") % EMBEDDING_DIMENSIONS
+        weight = 1.0 if feature.startswith("c:") else 2.0
+        vector[index] = vector.get(index, 0.0) + weight
+
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {k: v / norm for k, v in vector.items()}
+
+
+def cosine_similarity(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class SemanticQueryCache:
+    """
+    TTL and LRU bounded cache of question → Cypher translations
+
+    Entries are only valid for the schema fingerprint they were generated
+    against; set_schema_fingerprint drops everything when it changes.
+    """
+
+    def __init__(
+        self,
+        max_entries=QUERY_CACHE_MAX_ENTRIES,
+        ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+        similarity=QUERY_CACHE_SIMILARITY,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.schema_fingerprint = None
+        self.entries = OrderedDict()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def set_schema_fingerprint(self, schema):
+        """Invalidate the cache if the schema changed since it was filled"""
+        fingerprint = hashlib.sha256(str(schema).encode()).hexdigest()
+        with self._lock:
+            if fingerprint != self.schema_fingerprint:
+                self.entries.clear()
+                self.schema_fingerprint = fingerprint
+
+    def _is_expired(self, entry, now):
+        return now - entry["created_at"] > self.ttl_seconds
+
+    def get(self, question):
+        """
+        Look up a question
+
+        Returns:
+            dict: Copy of the cached entry with at least 'cypher_query' and
+                'exact' (False for a rephrasing that only matched
+                semantically), or None on a miss
+        """
+        normalized = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(normalized)
+            if entry is not None and not self._is_expired(entry, now):
+                self.entries.move_to_end(normalized)
+                self.exact_hits += 1
+                return {**entry, "exact": True}
+
+            names = get_question_names(normalized)
+            embedding = embed_question(normalized)
+            best_key, best_score = None, self.similarity
+            for key, candidate in list(self.entries.items()):
+                if self._is_expired(candidate, now):
+                    del self.entries[key]
+                    continue
+                if candidate["names"] != names:
+                    continue
+                score = cosine_similarity(embedding, candidate["embedding"])
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(best_key)
+            self.semantic_hits += 1
+            return {**self.entries[best_key], "exact": False}
+
+    def put(self, question, **values):
+        normalized = normalize_question(question)
+        entry = {
+            **values,
+            "question": question,
+            "names": get_question_names(normalized),
+            "embedding": embed_question(normalized),
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self.entries[normalized] = entry
+            self.entries.move_to_end(normalized)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        hits = self.exact_hits + self.semantic_hits
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+        }
@@ -0,0 +1,504 @@
+"""
+Deterministic structural extraction with Python's ast module
+
+Emits the same ALLOWED_NODES / ALLOWED_RELATIONSHIPS schema as the LLM
+transformer (Module, Class, Function, Method, Variable, Constant,
+Attribute with IMPORTS, CONTAINS, CALLS, INSTANTIATES) straight from the
+source, so the LLM is only needed for semantic enrichment.
+"""
+
+import ast
+import os
+from functools import lru_cache
+
+from langchain_community.graphs.graph_document import Node, Relationship
+
+from modules.utils.code_parser import read_and_analyze_file
+
+
+def get_module_name(file_path, root_dir=None):
+    """
+    Derive the dotted module name of a file
+
+    The name is relative to root_dir when the file is inside it, which also
+    covers namespace packages; otherwise it follows the __init__.py package
+    directories above the file.
+
+    Args:
+        file_path (str): Path to a Python file
+        root_dir (str): Root directory of the ingested project
+
+    Returns:
+        tuple: (dotted module name such as 'modules.utils.ast_parser',
+            directory the name is relative to)
+    """
+    file_path = os.path.abspath(file_path)
+    if root_dir:
+        root_dir = os.path.abspath(root_dir)
+        relative = os.path.relpath(os.path.splitext(file_path)[0], root_dir)
+        if not relative.startswith(os.pardir):
+            parts = relative.split(os.sep)
+            if parts[-1] == "__init__" and len(parts) > 1:
+                parts = parts[:-1]
+            return ".".join(parts), root_dir
+
+    directory, file_name = os.path.split(file_path)
+    stem = os.path.splitext(file_name)[0]
+    parts = [] if stem == "__init__" else [stem]
+    while os.path.exists(os.path.join(directory, "__init__.py")):
+        directory, package = os.path.split(directory)
+        parts.insert(0, package)
+    return ".".join(parts) or stem, directory
+
+
+@lru_cache(maxsize=4096)
+def find_local_module(root, dotted_name):
+    """
+    Find the longest prefix of a dotted name that is a module under root
+
+    Returns:
+        str: Dotted module name or None if the name is not part of the project
+    """
+    parts = dotted_name.split(".")
+    for end in range(len(parts), 0, -1):
+        path = os.path.join(root, *parts[:end])
+        if os.path.isfile(path + ".py") or os.path.isfile(os.path.join(path, "__init__.py")):
+            return ".".join(parts[:end])
+    return None
+
+
+def get_module_path(root, module):
+    """Return the file of a dotted module under root, or None"""
+    path = os.path.join(root, *module.split("."))
+    if os.path.isfile(path + ".py"):
+        return path + ".py"
+    init_path = os.path.join(path, "__init__.py")
+    return init_path if os.path.isfile(init_path) else None
+
+
+@lru_cache(maxsize=1024)
+def read_module_names(path, mtime, module):
+    """
+    Top-level names of a module file
+
+    Args:
+        path (str): Path to the module file
+        mtime (float): Modification time, so edited files are read again
+        module (str): Dotted name of the module, to resolve relative imports
+
+    Returns:
+        dict: Defined names mapped to 'Class' or 'Function', and names
+            imported with 'from ... import' mapped to their dotted origin
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, UnicodeDecodeError, SyntaxError, ValueError):
+        return {}
+
+    package = module.split(".")
+    if os.path.basename(path) != "__init__.py":
+        package = package[:-1]
+    names = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            names[node.name] = "Class"
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            names[node.name] = "Function"
+        elif isinstance(node, ast.ImportFrom):
+            source = node.module
+            if node.level:
+                base = package[: max(0, len(package) - (node.level - 1))]
+                source = ".".join([p for p in base + [node.module or ""] if p])
+            for alias in node.names:
+                if source and alias.name != "*":
+                    names[alias.asname or alias.name] = f"{source}.{alias.name}"
+    return names
+
+
+def resolve_definition(root, dotted_name, max_hops=3):
+    """
+    Resolve a dotted name to the module-level class or function it refers
+    to, following re-exports such as a package __init__ importing it
+
+    Returns:
+        tuple: (dotted id of the definition, 'Class' or 'Function') or None
+            if the name is not a class or function defined in the project
+    """
+    module = find_local_module(root, dotted_name)
+    if not module or module == dotted_name:
+        return None
+    name = dotted_name[len(module) + 1:]
+    if "." in name:
+        return None
+
+    path = get_module_path(root, module)
+    value = read_module_names(path, os.path.getmtime(path), module).get(name)
+    if value in ("Class", "Function"):
+        return dotted_name, value
+    if value and max_hops:
+        return resolve_definition(root, value, max_hops - 1)
+    return None
+
+
+def find_root_dir(file_path, root_dirs):
+    """Return the ingested directory that contains the file, if any"""
+    file_path = os.path.abspath(file_path)
+    for root_dir in root_dirs or []:
+        root_dir = os.path.abspath(root_dir)
+        if os.path.commonpath([root_dir, file_path]) == root_dir:
+            return root_dir
+    return None
+
+
+def get_visibility(name):
+    if name.startswith("__") and not name.endswith("__"):
+        return "private"
+    if name.startswith("_"):
+        return "protected"
+    return "public"
+
+
+def unparse(node):
+    return ast.unparse(node) if node is not None else None
+
+
+def get_parameters(args):
+    """Format function parameters as 'name: type = default' strings"""
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    parameters = []
+
+    def _format(arg, default, prefix=""):
+        text = prefix + arg.arg
+        if arg.annotation is not None:
+            text += f": {unparse(arg.annotation)}"
+        if default is not None:
+            text += f" = {unparse(default)}"
+        return text
+
+    for arg, default in zip(positional, defaults):
+        parameters.append(_format(arg, default))
+    if args.vararg:
+        parameters.append(_format(args.vararg, None, "*"))
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        parameters.append(_format(arg, default))
+    if args.kwarg:
+        parameters.append(_format(args.kwarg, None, "**"))
+    return parameters
+
+
+def get_call_name(func):
+    """Dotted name of a call target such as 'self.save' or 'os.path.join'"""
+    parts = []
+    while isinstance(func, ast.Attribute):
+        parts.insert(0, func.attr)
+        func = func.value
+    if isinstance(func, ast.Name):
+        parts.insert(0, func.id)
+        return ".".join(parts)
+    return None
+
+
+# Nodes that can never contain a definition, assignment or call
+LEAF_NODES = (
+    ast.Constant,
+    ast.Name,
+    ast.expr_context,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+    ast.boolop,
+    ast.Pass,
+    ast.Break,
+    ast.Continue,
+)
+
+
+class StructureExtractor(ast.NodeVisitor):
+    """Walk a module's AST and collect graph nodes and relationships"""
+
+    def __init__(self, module_name, root, file_path):
+        self.module_name = module_name
+        self.root = root
+        self.file_path = file_path
+        self.nodes = {}
+        self.relationships = {}
+        self.scopes = []
+        self.imported_names = {}
+        self.definitions = {}
+        self.pending_calls = []
+
+        self.module_node = self.add_node(
+            module_name,
+            "Module",
+            {"name": module_name, "type": "module", "scope": "global", "line_number": 1},
+        )
+
+    # -- graph helpers -------------------------------------------------
+
+    def add_node(self, node_id, label, properties, defined_here=True):
+        properties = {k: v for k, v in properties.items() if v not in (None, [], "")}
+        if defined_here:
+            properties["file_path"] = self.file_path
+        if node_id not in self.nodes:
+            self.nodes[node_id] = Node(id=node_id, type=label, properties=properties)
+        return self.nodes[node_id]
+
+    def add_relationship(self, source, target, rel_type, properties=None):
+        key = (source.id, target.id, rel_type)
+        if key not in self.relationships:
+            self.relationships[key] = Relationship(
+                source=source, target=target, type=rel_type, properties=properties or {}
+            )
+
+    @property
+    def current(self):
+        return self.scopes[-1] if self.scopes else self.module_node
+
+    def qualify(self, name):
+        return f"{self.current.id}.{name}"
+
+    def scope_kind(self):
+        if not self.scopes:
+            return "global"
+        return "class" if self.current.type == "Class" else "function"
+
+    def resolve_module(self, module, level):
+        if not level:
+            return module
+        # A package's __init__ already names the package itself
+        base = self.module_name.split(".")
+        if os.path.basename(self.file_path) != "__init__.py":
+            base = base[:-1]
+        base = base[: max(0, len(base) - (level - 1))]
+        return ".".join([p for p in base + [module or ""] if p])
+
+    # -- visitors ------------------------------------------------------
+
+    def generic_visit(self, node):
+        # Leaner than NodeVisitor.generic_visit: leaves are skipped and only
+        # node types with a visitor are dispatched
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, LEAF_NODES):
+                continue
+            visitor = getattr(self, "visit_" + child.__class__.__name__, None)
+            if visitor is None:
+                self.generic_visit(child)
+            else:
+                visitor(child)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            target = self.add_node(
+                alias.name, "Module", {"name": alias.name, "type": "module"}, defined_here=False
+            )
+            self.add_relationship(self.module_node, target, "IMPORTS", {"line_number": node.lineno})
+            self.imported_names[alias.asname or alias.name.split(".")[0]] = (
+                alias.name if alias.asname else alias.name.split(".")[0]
+            )
+
+    def visit_ImportFrom(self, node):
+        module = self.resolve_module(node.module, node.level)
+        if not module:
+            return
+        target = self.add_node(
+            module, "Module", {"name": module, "type": "module"}, defined_here=False
+        )
+        self.add_relationship(
+            self.module_node,
+            target,
+            "IMPORTS",
+            {"line_number": node.lineno, "names": [a.name for a in node.names]},
+        )
+        for alias in node.names:
+            if alias.name != "*":
+                self.imported_names[alias.asname or alias.name] = f"{module}.{alias.name}"
+
+    def visit_ClassDef(self, node):
+        class_id = self.qualify(node.name)
+        class_node = self.add_node(
+            class_id,
+            "Class",
+            {
+                "name": node.name,
+                "type": "class",
+                "scope": self.scope_kind(),
+                "line_number": node.lineno,
+                "docstring": ast.get_docstring(node),
+                "visibility": get_visibility(node.name),
+                "decorators": [unparse(d) for d in node.decorator_list],
+                "base_classes": [unparse(b) for b in node.bases],
+            },
+        )
+        self.add_relationship(self.current, class_node, "CONTAINS")
+        if not self.scopes:
+            self.definitions[node.name] = class_node
+
+        self.scopes.append(class_node)
+        self.generic_visit(node)
+        self.scopes.pop()
+
+    def visit_FunctionDef(self, node):
+        is_method = bool(self.scopes) and self.current.type == "Class"
+        function_id = self.qualify(node.name)
+        function_node = self.add_node(
+            function_id,
+            "Method" if is_method else "Function",
+            {
+                "name": node.name,
+                "type": "method" if is_method else "function",
+                "scope": self.scope_kind(),
+                "line_number": node.lineno,
+                "docstring": ast.get_docstring(node),
+                "visibility": get_visibility(node.name),
+                "parameters": get_parameters(node.args),
+                "return_type": unparse(node.returns),
+                "decorators": [unparse(d) for d in node.decorator_list],
+                "is_async": isinstance(node, ast.AsyncFunctionDef) or None,
+            },
+        )
+        self.add_relationship(self.current, function_node, "CONTAINS")
+        if not self.scopes:
+            self.definitions[node.name] = function_node
+
+        self.scopes.append(function_node)
+        self.generic_visit(node)
+        self.scopes.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Assign(self, node):
+        for target in node.targets:
+            self.add_assignment(target, node.lineno)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node):
+        self.add_assignment(node.target, node.lineno, unparse(node.annotation))
+        self.generic_visit(node)
+
+    def add_assignment(self, target, line_number, annotation=None):
+        if isinstance(target, (ast.Tuple, ast.List)):
+            for element in target.elts:
+                self.add_assignment(element, line_number, annotation)
+            return
+
+        owner = None
+        name = None
+        if isinstance(target, ast.Name) and self.scope_kind() in ("global", "class"):
+            owner, name = self.current, target.id
+        elif (
+            isinstance(target, ast.Attribute)
+            and isinstance(target.value, ast.Name)
+            and target.value.id == "self"
+            and len(self.scopes) >= 2
+            and self.scopes[-2].type == "Class"
+        ):
+            owner, name = self.scopes[-2], target.attr
+        if owner is None:
+            return
+
+        if owner.type == "Class":
+            label = "Attribute"
+        else:
+            label = "Constant" if name.isupper() else "Variable"
+        variable = self.add_node(
+            f"{owner.id}.{name}",
+            label,
+            {
+                "name": name,
+                "type": label.lower(),
+                "scope": "class" if owner.type == "Class" else "global",
+                "line_number": line_number,
+                "visibility": get_visibility(name),
+                "type_hint": annotation,
+            },
+        )
+        self.add_relationship(owner, variable, "CONTAINS")
+
+    def visit_Call(self, node):
+        if self.scopes and self.current.type in ("Function", "Method"):
+            call_name = get_call_name(node.func)
+            if call_name:
+                class_scope = next(
+                    (s for s in reversed(self.scopes) if s.type == "Class"), None
+                )
+                self.pending_calls.append((self.current, call_name, class_scope, node.lineno))
+        self.generic_visit(node)
+
+    # -- call resolution -----------------------------------------------
+
+    def resolve_calls(self):
+        """Link recorded calls once every definition in the module is known"""
+        for caller, call_name, class_scope, line_number in self.pending_calls:
+            head, _, rest = call_name.partition(".")
+            target = None
+            if head == "self" and class_scope is not None and rest and "." not in rest:
+                target = self.nodes.get(f"{class_scope.id}.{rest}")
+            elif not rest and head in self.definitions:
+                target = self.definitions[head]
+            elif head in self.imported_names:
+                # Only link to definitions inside the ingested project, with
+                # the label they are stored under so the typed MATCH finds them
+                resolved = resolve_definition(
+                    self.root, self.imported_names[head] + (f".{rest}" if rest else "")
+                )
+                if resolved:
+                    target_id, label = resolved
+                    target = Node(
+                        id=target_id, type=label, properties={"name": target_id.rpartition(".")[2]}
+                    )
+
+            if target is None or target.type not in ("Function", "Method", "Class"):
+                continue
+            rel_type = "INSTANTIATES" if target.type == "Class" else "CALLS"
+            self.add_relationship(caller, target, rel_type, {"line_number": line_number})
+
+
+def extract_graph_from_source(code_content, file_path, root_dir=None):
+    """
+    Extract structural nodes and relationships from Python source
+
+    Args:
+        code_content (str): Python source code
+        file_path (str): Path recorded on every node
+        root_dir (str): Root directory module names are relative to
+
+    Returns:
+        tuple: (nodes, relationships) or None if the source does not parse
+    """
+    try:
+        tree = ast.parse(code_content, filename=file_path)
+    except (SyntaxError, ValueError) as e:
+        print(f"❌ AST parsing error in {file_path}: {e}")
+        return None
+
+    module_name, root = get_module_name(file_path, root_dir)
+    extractor = StructureExtractor(module_name, root, file_path)
+    docstring = ast.get_docstring(tree)
+    if docstring:
+        extractor.module_node.properties["docstring"] = docstring
+    extractor.visit(tree)
+    extractor.resolve_calls()
+    return list(extractor.nodes.values()), list(extractor.relationships.values())
+
+
+def parse_code_with_ast(file_path, root_dir=None):
+    code_content = read_and_analyze_file(file_path)
+    if code_content is None:
+        return None
+
+    extracted = extract_graph_from_source(code_content, file_path, root_dir)
+    if extracted is None:
+        return None
+
+    nodes, relationships = extracted
+    return {
+        "file": file_path,
+        "nodes": nodes,
+        "relationships": relationships,
+        "node_count": len(nodes),
+        "relationship_count": len(relationships),
+        "chunks_processed": 1,
+        "parsing_method": "ast",
+    }
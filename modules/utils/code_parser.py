@@ -1,8 +1,22 @@
+import ast
 import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from langchain_core.documents import Document
 
-from modules.config.config import MAX_CHUNK_SIZE, LARGE_FILE_THRESHOLD, CHUNK_OVERLAP_LINES
+from modules.config.config import (
+    MAX_CHUNK_SIZE,
+    LARGE_FILE_THRESHOLD,
+    CHUNK_OVERLAP_LINES,
+    CHUNKING_STRATEGY,
+    MAX_CONCURRENT_LLM_REQUESTS,
+)
+
+# Caps the number of in-flight LLM requests across all files and chunks
+llm_request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_LLM_REQUESTS)
 
 
 def split_code_into_chunks(code_content, max_chunk_size=MAX_CHUNK_SIZE):
@@ -29,6 +43,143 @@ def split_code_into_chunks(code_content, max_chunk_size=MAX_CHUNK_SIZE):
     return chunks
 
 
+def get_definition_start(node):
+    """First line of a statement, including its decorators"""
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def get_statement_units(body, lines, start_index):
+    """
+    Split a statement body into (node, text) units
+
+    Each unit spans from the end of the previous statement, so comments
+    above a definition stay with it. Consecutive plain statements are
+    merged into one unit with node None; imports are skipped since they
+    go in the chunk header.
+    """
+    units = []
+    previous_end = start_index
+    for node in body:
+        text = "\n".join(lines[previous_end:node.end_lineno])
+        previous_end = node.end_lineno
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            continue
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            units.append((node, text))
+        elif units and units[-1][0] is None:
+            units[-1] = (None, units[-1][1] + "\n" + text)
+        else:
+            units.append((None, text))
+    return units
+
+
+def get_import_header(tree, code_content):
+    """
+    Build a function returning the compact symbol header of a chunk
+
+    The header only lists the module imports whose bound names appear in
+    the chunk, so every chunk keeps the context it needs without resending
+    the whole import block.
+    """
+    imports = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names = {
+                alias.asname or alias.name.split(".")[0] for alias in node.names
+            }
+            imports.append((names, ast.get_source_segment(code_content, node) or ""))
+
+    def build_header(body):
+        words = set(re.findall(r"\w+", body))
+        relevant = [text for names, text in imports if "*" in names or names & words]
+        return "# Module imports\n" + "\n".join(relevant) + "\n\n" if relevant else ""
+
+    return build_header
+
+
+def pack_units(texts, prefix, budget):
+    """Greedily pack whole unit texts into chunk bodies of up to budget characters"""
+    bodies, current, current_size = [], [], 0
+    for text in texts:
+        if current and current_size + len(text) + 1 > budget:
+            bodies.append(prefix + "\n".join(current))
+            current, current_size = [], 0
+        current.append(text)
+        current_size += len(text) + 1
+    if current:
+        bodies.append(prefix + "\n".join(current))
+    return bodies
+
+
+def split_code_into_ast_chunks(code_content, max_chunk_size=MAX_CHUNK_SIZE):
+    """
+    Split Python code into chunks along function and class boundaries
+
+    Whole top-level definitions are packed into chunks of up to
+    max_chunk_size characters. Every chunk starts with a compact header of
+    the imports it uses instead of overlapping lines. Classes too large for
+    one chunk are split by member under their 'class X(...):' line, and
+    only single definitions that still do not fit fall back to line chunks.
+    Code that does not parse falls back to split_code_into_chunks.
+    """
+    if len(code_content) <= max_chunk_size:
+        return [code_content]
+
+    try:
+        tree = ast.parse(code_content)
+    except (SyntaxError, ValueError):
+        return split_code_into_chunks(code_content, max_chunk_size)
+
+    lines = code_content.split("\n")
+    build_header = get_import_header(tree, code_content)
+    # Headers are at most a quarter of a chunk, the rest is the budget for code
+    header_budget = max_chunk_size // 4
+    budget = max_chunk_size - min(len(build_header(code_content)), header_budget)
+
+    def split_oversized(text, prefix):
+        return [
+            prefix + part
+            for part in split_code_into_chunks(text, max(1, budget - len(prefix)))
+        ]
+
+    bodies, pending = [], []
+    for node, text in get_statement_units(tree.body, lines, 0):
+        if len(text) <= budget:
+            pending.append(text)
+            continue
+
+        bodies.extend(pack_units(pending, "", budget))
+        pending = []
+
+        if not isinstance(node, ast.ClassDef):
+            bodies.extend(split_oversized(text, ""))
+            continue
+
+        body_start = get_definition_start(node.body[0]) - 1
+        class_line = "\n".join(lines[get_definition_start(node) - 1:body_start])
+        class_prefix = f"# Members of class {node.name}\n{class_line}\n"
+        members = []
+        for _, member_text in get_statement_units(node.body, lines, body_start):
+            if len(class_prefix) + len(member_text) <= budget:
+                members.append(member_text)
+            else:
+                bodies.extend(pack_units(members, class_prefix, budget - len(class_prefix)))
+                members = []
+                bodies.extend(split_oversized(member_text, class_prefix))
+        bodies.extend(pack_units(members, class_prefix, budget - len(class_prefix)))
+
+    bodies.extend(pack_units(pending, "", budget))
+
+    chunks = []
+    for body in bodies:
+        header = build_header(body)
+        if len(header) > header_budget:
+            header = header[:header_budget].rsplit("\n", 1)[0] + "\n\n"
+        chunks.append(header + body)
+    return chunks
+
+
 def read_and_analyze_file(file_path):
     try:
         with open(file_path, "r", encoding="utf-8") as file:
@@ -42,28 +193,49 @@ def read_and_analyze_file(file_path):
 
 
 def process_single_chunk(chunk, metadata, transformer):
+    """
+    Extract the graph of one chunk
+
+    Errors are raised rather than returning an empty graph, so a file with a
+    failed chunk is reported as failed instead of being saved (and cached)
+    with part of its graph missing.
+    """
+    docs = [Document(page_content=chunk, metadata=metadata)]
     try:
-        docs = [Document(page_content=chunk, metadata=metadata)]
-        graph_docs = transformer.convert_to_graph_documents(docs)
-        if graph_docs and graph_docs[0]:
-            return graph_docs[0].nodes, graph_docs[0].relationships
+        with llm_request_slots:
+            graph_docs = transformer.convert_to_graph_documents(docs)
     except Exception as e:
         print(f"❌ Chunk processing error: {e}")
+        raise
+    if graph_docs and graph_docs[0]:
+        return graph_docs[0].nodes, graph_docs[0].relationships
     return [], []
 
 
 def parse_large_file_in_chunks(code_content, transformer):
-    chunks = split_code_into_chunks(code_content)
+    if CHUNKING_STRATEGY == "ast":
+        chunks = split_code_into_ast_chunks(code_content)
+    else:
+        chunks = split_code_into_chunks(code_content)
     current_time = datetime.now().isoformat()
     
     all_nodes, all_relationships = [], []
+    empty_chunks = 0
 
-    for i, chunk in enumerate(chunks):
+    def process_indexed_chunk(indexed_chunk):
+        i, chunk = indexed_chunk
         unique_id = hashlib.md5(f"{chunk}{current_time}".encode()).hexdigest()[:16]
         metadata = {"source": f"chunk_{i+1}", "unique_id": unique_id}
-        nodes, relationships = process_single_chunk(chunk, metadata, transformer)
-        all_nodes.extend(nodes)
-        all_relationships.extend(relationships)
+        return process_single_chunk(chunk, metadata, transformer)
+
+    # Chunks are sent concurrently; map() keeps results in chunk order
+    max_workers = max(1, min(MAX_CONCURRENT_LLM_REQUESTS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for nodes, relationships in executor.map(process_indexed_chunk, enumerate(chunks)):
+            if not nodes and not relationships:
+                empty_chunks += 1
+            all_nodes.extend(nodes)
+            all_relationships.extend(relationships)
 
     unique_nodes = {getattr(n, "id", str(n)): n for n in all_nodes}
 
@@ -73,6 +245,7 @@ def parse_large_file_in_chunks(code_content, transformer):
         "node_count": len(unique_nodes),
         "relationship_count": len(all_relationships),
         "chunks_processed": len(chunks),
+        "empty_chunks": empty_chunks,
     }
 
 
@@ -93,16 +266,282 @@ def parse_small_file(code_content, transformer):
         return None
 
 
-def parse_code_with_llm(file_path, transformer):
+PACK_HEADER = (
+    "The following are {count} separate Python files, each between a "
+    "'# ===== FILE: <path> =====' and a '# ===== END FILE: <path> =====' line. "
+    "Set the file_path property of every node and relationship to the <path> "
+    "of the file it comes from.\n\n"
+)
+
+
+def build_pack_document(files):
+    """
+    Join several files into one extraction input with per-file delimiters
+
+    Args:
+        files (list): (file_path, code_content) pairs
+    """
+    parts = [PACK_HEADER.format(count=len(files))]
+    for file_path, code_content in files:
+        parts.append(f"# ===== FILE: {file_path} =====\n{code_content.rstrip()}\n# ===== END FILE: {file_path} =====\n")
+    return "\n".join(parts)
+
+
+def match_pack_file(value, file_paths):
+    """Map a file_path property written by the LLM to one of the packed files"""
+    if not value:
+        return None
+    value = str(value).strip().replace("\\", "/")
+    for file_path in file_paths:
+        normalized = file_path.replace("\\", "/")
+        if value == normalized or normalized.endswith("/" + value) or value.endswith("/" + normalized):
+            return file_path
+    matches = [f for f in file_paths if os.path.basename(f) == os.path.basename(value)]
+    return matches[0] if len(matches) == 1 else None
+
+
+def get_defined_names(code_content):
+    """Names a file defines: classes, functions and assigned names and attributes"""
+    try:
+        tree = ast.parse(code_content)
+    except (SyntaxError, ValueError):
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store):
+            names.add(node.attr)
+    return names
+
+
+def split_pack_result(nodes, relationships, files):
+    """
+    Split the graph extracted from a pack back into per-file graphs
+
+    Nodes and relationships go to the file named by their file_path
+    property; relationships without one follow their source node. Nodes
+    without one go to the file defining their name, else to the file
+    module they name, else to the file whose code mentions the name as a
+    whole identifier. Each file also gets the endpoints of its
+    relationships, as a separate extraction of that file would have
+    produced them.
+
+    Returns:
+        tuple: ({file_path: (nodes, relationships)}, number of dropped nodes
+            and relationships, set of files an item could not be told apart
+            between; those should be extracted on their own)
+    """
+    file_paths = [file_path for file_path, _ in files]
+    contents = dict(files)
+    nodes_by_id = {getattr(n, "id", str(n)): n for n in nodes}
+    lookups = [
+        {f: get_defined_names(contents[f]) for f in file_paths},
+        {f: {os.path.splitext(os.path.basename(f))[0]} for f in file_paths},
+        {f: set(re.findall(r"[A-Za-z_]\w*", contents[f])) for f in file_paths},
+    ]
+
+    def find_files(node_id):
+        name = str(node_id or "").strip()
+        if name.endswith(".py"):
+            name = name[:-3]
+        name = name.replace("/", ".").rpartition(".")[2]
+        for names_by_file in lookups:
+            matches = [f for f in file_paths if name in names_by_file[f]]
+            if matches:
+                return matches
+        return []
+
+    node_files = {}
+    for node_id, node in nodes_by_id.items():
+        file_path = match_pack_file(getattr(node, "properties", {}).get("file_path"), file_paths)
+        node_files[node_id] = [file_path] if file_path else find_files(node_id)
+
+    split = {file_path: ({}, []) for file_path in file_paths}
+    dropped = 0
+    ambiguous = set()
+
+    def attribute(candidates):
+        if len(candidates) > 1:
+            ambiguous.update(candidates)
+            return None
+        return candidates[0] if candidates else None
+
+    for rel in relationships:
+        file_path = match_pack_file(getattr(rel, "properties", {}).get("file_path"), file_paths)
+        source_id = getattr(rel.source, "id", None)
+        target = file_path or attribute(
+            node_files.get(source_id) if source_id in node_files else find_files(source_id)
+        )
+        if target is None:
+            dropped += 1
+            continue
+        file_nodes, file_relationships = split[target]
+        file_relationships.append(rel)
+        for endpoint in (rel.source, rel.target):
+            endpoint_id = getattr(endpoint, "id", str(endpoint))
+            file_nodes.setdefault(endpoint_id, nodes_by_id.get(endpoint_id, endpoint))
+
+    for node_id, node in nodes_by_id.items():
+        candidates = node_files[node_id]
+        if len(candidates) == 1:
+            split[candidates[0]][0].setdefault(node_id, node)
+        elif not any(node_id in split[f][0] for f in file_paths):
+            # Nodes already carried by a relationship are not lost
+            if attribute(candidates) is None and not candidates:
+                dropped += 1
+
+    return {
+        file_path: (list(file_nodes.values()), file_relationships)
+        for file_path, (file_nodes, file_relationships) in split.items()
+    }, dropped, ambiguous
+
+
+def parse_small_files_packed(file_paths, transformer, cache=None):
+    """
+    Extract several small files with a single LLM request
+
+    Files cached from an extraction of their own are served from the cache,
+    the others are packed into one document and the extracted graph is
+    split back per file. The split is cached under the whole pack document,
+    so it is only reused for the very same pack.
+
+    Returns:
+        dict: {file_path: result} for the files that produced a graph;
+            files missing from it should be extracted on their own
+    """
+    results, files = {}, []
+    for file_path in file_paths:
+        code_content = read_and_analyze_file(file_path)
+        if not code_content:
+            continue
+        result = cache.get(code_content) if cache is not None else None
+        if result:
+            result["file"] = file_path
+            results[file_path] = result
+        else:
+            files.append((file_path, code_content))
+
+    if len(files) == 1:
+        file_path, code_content = files[0]
+        result = parse_small_file(code_content, transformer)
+        if result:
+            if cache is not None:
+                cache.put(code_content, result)
+            result["file"] = file_path
+            results[file_path] = result
+        return results
+    if not files:
+        return results
+
+    document = build_pack_document(files)
+    cached = cache.get(document) if cache is not None else None
+    if cached:
+        split_results = cached["files"]
+    else:
+        unique_id = hashlib.md5(document.encode()).hexdigest()[:16]
+        metadata = {"source": f"pack_of_{len(files)}", "unique_id": unique_id}
+        nodes, relationships = process_single_chunk(document, metadata, transformer)
+        split, dropped, ambiguous = split_pack_result(nodes, relationships, files)
+        if dropped:
+            print(f"⚠️ {dropped} nodes and relationships of a pack could not be attributed to a file")
+        if ambiguous:
+            print(f"⚠️ {len(ambiguous)} files of a pack share unattributed items, extracting them on their own")
+
+        split_results = {}
+        for file_path, (file_nodes, file_relationships) in split.items():
+            # Files an item may belong to are left out and re-extracted alone
+            if not file_nodes or file_path in ambiguous:
+                continue
+            split_results[file_path] = {
+                "nodes": file_nodes,
+                "relationships": file_relationships,
+                "node_count": len(file_nodes),
+                "relationship_count": len(file_relationships),
+                "chunks_processed": 1,
+            }
+        if cache is not None and split_results:
+            cache.put(document, {"files": split_results})
+
+    for file_path, result in split_results.items():
+        results[file_path] = dict(result, file=file_path)
+    return results
+
+
+def parse_code_with_llm(file_path, transformer, cache=None):
     code_content = read_and_analyze_file(file_path)
     if not code_content:
         return None
 
+    if cache is not None:
+        result = cache.get(code_content)
+        if result:
+            result["file"] = file_path
+            return result
+
     if len(code_content) > LARGE_FILE_THRESHOLD:
         result = parse_large_file_in_chunks(code_content, transformer)
     else:
         result = parse_small_file(code_content, transformer)
 
     if result:
+        # A chunk that came back empty may be a failed or unparsable LLM
+        # response, so a result with one is not stored for future runs
+        if cache is not None and not result.get("empty_chunks"):
+            cache.put(code_content, result)
         result["file"] = file_path
     return result
+
+
+def merge_graph_results(structural, semantic):
+    """
+    Merge an AST result with an LLM result for the same file
+
+    Structural nodes win on conflicting properties, while the LLM result
+    adds its semantic nodes, properties and relationships. The LLM names
+    entities by their short name ('login') where the AST uses dotted ids
+    ('pkg.auth.login'), so LLM ids are first mapped onto the structural id
+    they unambiguously end with.
+    """
+    if not structural or not semantic:
+        return structural or semantic
+
+    structural_nodes = {node.id: node for node in structural["nodes"]}
+    aliases = {}
+    for node in structural["nodes"]:
+        parts = node.id.split(".")
+        for start in range(1, len(parts)):
+            aliases.setdefault(".".join(parts[start:]), []).append(node)
+
+    def canonical(node):
+        if node.id in structural_nodes:
+            return structural_nodes[node.id]
+        candidates = aliases.get(node.id, [])
+        if len(candidates) > 1:
+            candidates = [c for c in candidates if c.type == node.type]
+        return candidates[0] if len(candidates) == 1 else node
+
+    nodes = {}
+    for node in semantic["nodes"]:
+        target = canonical(node)
+        if target is not node:
+            target.properties = {**node.properties, **target.properties}
+        nodes[target.id] = target
+    for node in structural["nodes"]:
+        nodes[node.id] = node
+
+    for relationship in semantic["relationships"]:
+        relationship.source = nodes.get(canonical(relationship.source).id, relationship.source)
+        relationship.target = nodes.get(canonical(relationship.target).id, relationship.target)
+    relationships = structural["relationships"] + semantic["relationships"]
+    return {
+        **structural,
+        "nodes": list(nodes.values()),
+        "relationships": relationships,
+        "node_count": len(nodes),
+        "relationship_count": len(relationships),
+        "chunks_processed": semantic.get("chunks_processed", 1),
+        "parsing_method": "hybrid",
+    }
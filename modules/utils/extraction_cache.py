@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from modules.config.config import (
+    ALLOWED_NODES,
+    ALLOWED_RELATIONSHIPS,
+    MAX_CHUNK_SIZE,
+    LARGE_FILE_THRESHOLD,
+    CHUNK_OVERLAP_LINES,
+    CHUNKING_STRATEGY,
+    EXTRACTION_CACHE_FILE,
+    EXTRACTION_CACHE_MAX_BYTES,
+    get_enhanced_prompt,
+)
+
+
+def get_prompt_fingerprint():
+    """
+    Hash the extraction prompt template and graph schema
+
+    The enhanced prompt embeds a timestamp, so it is rendered with a fixed
+    placeholder to keep the fingerprint stable between runs.
+    """
+    fingerprint = json.dumps(
+        {
+            "prompt": get_enhanced_prompt("{timestamp}"),
+            "allowed_nodes": ALLOWED_NODES,
+            "allowed_relationships": ALLOWED_RELATIONSHIPS,
+            "chunking": [MAX_CHUNK_SIZE, LARGE_FILE_THRESHOLD, CHUNK_OVERLAP_LINES, CHUNKING_STRATEGY],
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(fingerprint.encode()).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Persistent, size-bounded LRU cache of LLM extraction results
+
+    Entries are keyed by the file content hash, the prompt fingerprint and
+    the model name, so a file is only re-sent to the LLM when its content,
+    the prompt, the schema or the model changes.
+    """
+
+    def __init__(self, model_name, cache_file=EXTRACTION_CACHE_FILE, max_bytes=EXTRACTION_CACHE_MAX_BYTES):
+        self.model_name = model_name
+        self.cache_file = cache_file
+        self.max_bytes = max_bytes
+        self.prompt_fingerprint = get_prompt_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        self._conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM extraction_cache"
+        ).fetchone()[0]
+
+    def make_key(self, code_content):
+        content_hash = hashlib.sha256(code_content.encode()).hexdigest()
+        key = f"{content_hash}:{self.prompt_fingerprint}:{self.model_name}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, code_content):
+        """
+        Look up the extraction result for a file content
+
+        Returns:
+            dict: Cached result without the 'file' key, or None on a miss
+        """
+        key = self.make_key(code_content)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE extraction_cache SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+            self.hits += 1
+        try:
+            return pickle.loads(row[0])
+        except Exception as e:
+            print(f"⚠️ Dropping unreadable cache entry: {e}")
+            self.invalidate(code_content)
+            return None
+
+    def put(self, code_content, result):
+        key = self.make_key(code_content)
+        payload = pickle.dumps(
+            {k: v for k, v in result.items() if k != "file"},
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, payload, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time()),
+            )
+            self._total_bytes += len(payload) - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def invalidate(self, code_content):
+        key = self.make_key(code_content)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+                self._total_bytes -= row[0]
+                self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM extraction_cache ORDER BY last_access ASC"
+        )
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM extraction_cache WHERE key = ?", evicted)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size_bytes": self._total_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,29 +1,23 @@
+import hashlib
 import json
 import os
 from datetime import datetime
 import shutil
 from pathlib import Path
 
+from modules.config.config import FILE_MANIFEST_FILE, GRAPH_LAYOUT_FILE
 
-def save_results_to_json(graph_info, output_file=None):
-    if not graph_info:
-        print("No graph information to save.")
-        return None
-
-    if not output_file:
-        output_file = os.path.join("outputs", "parsed_code.json")
 
-  
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+def serialize_graph_info(graph_info):
+    """
+    Convert a parsing result into a JSON-serializable record
 
-    existing_data = None
-    if output_file and os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-        try:
-            with open(output_file, "r", encoding="utf-8") as f:
-                existing_data = json.load(f)
-        except Exception as e:
-            print(f"⚠️ Could not read existing JSON file {output_file}: {e}")
+    Args:
+        graph_info (dict): Result of parsing a single file
 
+    Returns:
+        dict: Record with file metadata, nodes and relationships
+    """
     serializable_data = {
         "file": graph_info["file"],
         "content_hash": graph_info.get("content_hash", "unknown"),
@@ -37,20 +31,24 @@ def save_results_to_json(graph_info, output_file=None):
         "relationships": [],
     }
 
+    source_files = [graph_info["file"]]
+
     if "nodes" in graph_info:
         for node in graph_info["nodes"]:
+            properties = dict(node.properties) if hasattr(node, "properties") else {}
+            properties["source_files"] = source_files
             serializable_data["nodes"].append(
                 {
                     "id": str(node.id) if hasattr(node, "id") else str(node),
                     "type": str(node.type) if hasattr(node, "type") else "unknown",
-                    "properties": (
-                        dict(node.properties) if hasattr(node, "properties") else {}
-                    ),
+                    "properties": properties,
                 }
             )
 
     if "relationships" in graph_info:
         for rel in graph_info["relationships"]:
+            properties = dict(rel.properties) if hasattr(rel, "properties") else {}
+            properties["source_files"] = source_files
             serializable_data["relationships"].append(
                 {
                     "source": {
@@ -80,55 +78,203 @@ def save_results_to_json(graph_info, output_file=None):
                     "relationship_type": (
                         str(rel.type) if hasattr(rel, "type") else "unknown"
                     ),
-                    "properties": (
-                        dict(rel.properties) if hasattr(rel, "properties") else {}
-                    ),
+                    "properties": properties,
                 }
             )
 
-    if existing_data:
-        existing_nodes_dict = {
-            str(n.get("id")): n for n in existing_data.get("nodes", [])
-        }
-        for node in serializable_data["nodes"]:
-            existing_nodes_dict[str(node.get("id"))] = node
+    return serializable_data
 
-        merged_nodes = list(existing_nodes_dict.values())
 
-        def _rel_key(rel):
-            return (
-                rel["source"]["id"],
-                rel["target"]["id"],
-                rel["relationship_type"],
-            )
+def get_log_file(output_file):
+    """Path of the append-only log that is compacted into output_file"""
+    return os.path.splitext(output_file)[0] + ".jsonl"
+
+
+def append_results_to_log(graph_info, output_file=None):
+    """
+    Append the records of one parsed file to the results log
 
-        existing_rels_dict = {
-            _rel_key(rel): rel for rel in existing_data.get("relationships", [])
+    Each call writes a single JSON line, so saving a file costs O(its size)
+    regardless of how much has been parsed before. The log is merged into
+    output_file by compact_results_log.
+
+    Args:
+        graph_info (dict): Result of parsing a single file
+        output_file (str): Path of the compacted JSON file
+
+    Returns:
+        str: Path of the log file or None if error
+    """
+    if not graph_info:
+        print("No graph information to save.")
+        return None
+
+    return append_record_to_log(serialize_graph_info(graph_info), output_file)
+
+
+def append_record_to_log(record, output_file=None):
+    """
+    Append an already serialized record to the results log
+
+    Args:
+        record (dict): Record returned by serialize_graph_info
+        output_file (str): Path of the compacted JSON file
+
+    Returns:
+        str: Path of the log file or None if error
+    """
+    if not output_file:
+        output_file = os.path.join("outputs", "parsed_code.json")
+
+    log_file = get_log_file(output_file)
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+
+    try:
+        line = json.dumps(record, ensure_ascii=False)
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        return log_file
+    except Exception as e:
+        print(f"❌ Error appending to results log: {e}")
+        return None
+
+
+def read_results_log(log_file):
+    """Yield the records of a results log, skipping truncated lines"""
+    if not os.path.exists(log_file):
+        return
+    with open(log_file, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Skipping unreadable line {line_number} of {log_file}: {e}")
+
+
+def clear_results_log(output_file=None):
+    if not output_file:
+        output_file = os.path.join("outputs", "parsed_code.json")
+    log_file = get_log_file(output_file)
+    if os.path.exists(log_file):
+        os.remove(log_file)
+
+
+def rel_key(rel):
+    return (
+        rel["source"]["id"],
+        rel["target"]["id"],
+        rel["relationship_type"],
+    )
+
+
+def new_graph_index(data=None):
+    """
+    Build an index of a parsed graph keyed for deduplication
+
+    Args:
+        data (dict): Parsed JSON data to start from
+
+    Returns:
+        dict: {'metadata', 'nodes': {id: node}, 'relationships': {key: rel},
+            'processed_files': set}
+    """
+    data = data or {}
+    return {
+        "metadata": {
+            k: v for k, v in data.items()
+            if k not in ("nodes", "relationships", "processed_files")
+        },
+        "nodes": {str(n.get("id")): n for n in data.get("nodes", [])},
+        "relationships": {rel_key(rel): rel for rel in data.get("relationships", [])},
+        "processed_files": set(data.get("processed_files", [])),
+    }
+
+
+def merge_record(index, record):
+    """
+    Merge one parsed file record, or a partial graph, into a graph index
+
+    Later nodes and relationships win, keeping properties only known to
+    earlier ones (e.g. a module first seen as an import of another file),
+    and their source_files provenance is unioned.
+    """
+    if not index["metadata"] and "file" in record:
+        index["metadata"] = {
+            k: v for k, v in record.items()
+            if k not in ("nodes", "relationships", "processed_files")
         }
 
-        for rel in serializable_data["relationships"]:
-            existing_rels_dict[_rel_key(rel)] = rel
+    nodes_dict = index["nodes"]
+    for node in record.get("nodes", []):
+        node_id = str(node.get("id"))
+        if node_id in nodes_dict:
+            previous = nodes_dict[node_id]
+            node["properties"] = {
+                **previous.get("properties", {}),
+                **node.get("properties", {}),
+            }
+            merge_source_files(node, previous)
+        nodes_dict[node_id] = node
 
-        merged_relationships = list(existing_rels_dict.values())
+    rels_dict = index["relationships"]
+    for rel in record.get("relationships", []):
+        key = rel_key(rel)
+        if key in rels_dict:
+            merge_source_files(rel, rels_dict[key])
+        rels_dict[key] = rel
 
-        serializable_data = existing_data  # start from previous metadata
-        serializable_data["nodes"] = merged_nodes
-        serializable_data["relationships"] = merged_relationships
-        serializable_data["node_count"] = len(merged_nodes)
-        serializable_data["relationship_count"] = len(merged_relationships)
+    if "file" in record:
+        index["processed_files"].add(record["file"])
+    index["processed_files"].update(record.get("processed_files", []))
 
-        
-        processed_files = set(serializable_data.get("processed_files", []))
-        processed_files.add(graph_info["file"])
-        serializable_data["processed_files"] = sorted(processed_files)
+
+def merge_graph_index(index, partial):
+    """Merge a partial graph index built elsewhere, e.g. in a worker process"""
+    merge_record(
+        index,
+        {
+            "nodes": list(partial["nodes"].values()),
+            "relationships": list(partial["relationships"].values()),
+            "processed_files": partial["processed_files"],
+        },
+    )
+    if not index["metadata"]:
+        index["metadata"] = partial["metadata"]
+
+
+def load_graph_index(output_file):
+    data = {}
+    if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+        data = load_json_data(output_file) or {}
+    return new_graph_index(data)
+
+
+def write_graph_index(index, output_file):
+    """
+    Write a graph index as the parsed JSON file
+
+    Returns:
+        str: Path of the JSON file or None if error
+    """
+    data = dict(index["metadata"])
+    data["nodes"] = list(index["nodes"].values())
+    data["relationships"] = list(index["relationships"].values())
+    data["node_count"] = len(data["nodes"])
+    data["relationship_count"] = len(data["relationships"])
+    data["processed_files"] = sorted(index["processed_files"])
 
     try:
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        # json.dumps without indent uses the C encoder, which is several
+        # times faster than json.dump on large graphs
         with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(serializable_data, f, indent=2, ensure_ascii=False)
+            f.write(json.dumps(data, ensure_ascii=False))
 
         print(f"\n✅ Results saved to: {output_file}")
         print(
-            f"📊 Saved {len(serializable_data['nodes'])} nodes and {len(serializable_data['relationships'])} relationships"
+            f"📊 Saved {len(data['nodes'])} nodes and {len(data['relationships'])} relationships"
         )
 
         return output_file
@@ -138,6 +284,183 @@ def save_results_to_json(graph_info, output_file=None):
         return None
 
 
+def compact_results_log(output_file=None):
+    """
+    Merge the results log into the JSON file in a single pass
+
+    Nodes are deduplicated by id and relationships by (source, target, type);
+    later records win and their source_files provenance is unioned. The log
+    is removed once the JSON file has been written.
+
+    Args:
+        output_file (str): Path of the compacted JSON file
+
+    Returns:
+        str: Path of the JSON file or None if error
+    """
+    if not output_file:
+        output_file = os.path.join("outputs", "parsed_code.json")
+
+    log_file = get_log_file(output_file)
+
+    index = load_graph_index(output_file)
+    for record in read_results_log(log_file):
+        merge_record(index, record)
+
+    saved_file = write_graph_index(index, output_file)
+    if saved_file and os.path.exists(log_file):
+        os.remove(log_file)
+    return saved_file
+
+
+def merge_source_files(record, previous_record):
+    """
+    Union the source_files provenance of a node or relationship record
+    with the record it replaces, so shared records keep every source file
+    """
+    previous_files = previous_record.get("properties", {}).get("source_files", [])
+    properties = record.setdefault("properties", {})
+    properties["source_files"] = sorted(
+        set(previous_files) | set(properties.get("source_files", []))
+    )
+
+
+def remove_files_from_json(file_paths, output_file=None):
+    """
+    Remove the provenance of the given source files from the parsed JSON
+
+    Nodes and relationships that are left without any source file are
+    dropped; records without provenance are kept untouched.
+
+    Args:
+        file_paths (list): Source files whose records should be removed
+        output_file (str): Path to the parsed JSON file
+    """
+    if not output_file:
+        output_file = os.path.join("outputs", "parsed_code.json")
+
+    removed = set(file_paths)
+    if not removed:
+        return
+
+    index = load_graph_index(output_file)
+    if not index["nodes"] and not index["relationships"]:
+        return
+
+    def _keep(record):
+        properties = record.get("properties", {})
+        if "source_files" not in properties:
+            return True
+        properties["source_files"] = [
+            f for f in properties["source_files"] if f not in removed
+        ]
+        return bool(properties["source_files"])
+
+    for records in (index["nodes"], index["relationships"]):
+        for key in [k for k, record in records.items() if not _keep(record)]:
+            del records[key]
+    index["processed_files"] -= removed
+
+    if write_graph_index(index, output_file):
+        print(f"🗑️ Removed records of {len(removed)} files from {output_file}")
+
+
+def compute_file_hash(file_path):
+    """
+    Compute the SHA-256 hash of a file's content
+
+    Args:
+        file_path (str): Path to file
+
+    Returns:
+        str: Hex digest or None if the file cannot be read
+    """
+    try:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    except Exception as e:
+        print(f"❌ Error hashing file {file_path}: {e}")
+        return None
+
+
+def build_file_manifest(file_paths):
+    """
+    Map each file path to the hash of its content
+
+    Args:
+        file_paths (list): Paths of the files to hash
+
+    Returns:
+        dict: {file_path: content_hash} for every readable file
+    """
+    manifest = {}
+    for file_path in file_paths:
+        content_hash = compute_file_hash(file_path)
+        if content_hash:
+            manifest[file_path] = content_hash
+    return manifest
+
+
+def load_file_manifest(manifest_file=FILE_MANIFEST_FILE):
+    """
+    Load the manifest saved by the previous ingestion
+
+    Returns:
+        dict: Previous manifest or None if there is none
+    """
+    if not os.path.exists(manifest_file):
+        return None
+    return load_json_data(manifest_file)
+
+
+def save_file_manifest(manifest, manifest_file=FILE_MANIFEST_FILE):
+    os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+    try:
+        with open(manifest_file, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+    except Exception as e:
+        print(f"❌ Error saving file manifest: {e}")
+
+
+def save_graph_layout(positions, layout_file=GRAPH_LAYOUT_FILE):
+    """Save node positions computed by modules.utils.graph_layout"""
+    os.makedirs(os.path.dirname(layout_file), exist_ok=True)
+    with open(layout_file, "w", encoding="utf-8") as f:
+        f.write(json.dumps(positions))
+
+
+def load_graph_layout(layout_file=GRAPH_LAYOUT_FILE):
+    """
+    Returns:
+        dict: {node id: [x, y]}, empty if no layout was computed
+    """
+    try:
+        with open(layout_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def diff_file_manifests(previous_manifest, current_manifest):
+    """
+    Compare two manifests
+
+    Returns:
+        tuple: (added, changed, deleted) sorted lists of file paths
+    """
+    added = sorted(set(current_manifest) - set(previous_manifest))
+    deleted = sorted(set(previous_manifest) - set(current_manifest))
+    changed = sorted(
+        path
+        for path in set(current_manifest) & set(previous_manifest)
+        if current_manifest[path] != previous_manifest[path]
+    )
+    return added, changed, deleted
+
+
 def load_json_data(file_path):
     """
     Load data from JSON file
@@ -1,49 +1,290 @@
 import os
-from modules.llm.llm_setup import get_default_llm_and_transformer
-from modules.utils.code_parser import parse_code_with_llm
-from modules.utils.file_utils import save_results_to_json
-from modules.utils.file_utils import delete_file_content
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from modules.config.config import (
+    MAX_CONCURRENT_FILES,
+    EXTRACTION_MODE,
+    INGESTION_PROCESSES,
+    STREAM_BUFFER_SIZE,
+    LARGE_FILE_THRESHOLD,
+    FILE_PACKING,
+    PACK_MAX_FILES,
+    PACK_MAX_TOKENS,
+)
+from modules.llm.llm_setup import get_default_llm_and_transformer, get_model_name
+from modules.llm.scheduler import CHARS_PER_TOKEN
+from modules.utils.code_parser import (
+    parse_code_with_llm,
+    parse_small_files_packed,
+    merge_graph_results,
+)
+from modules.utils.ast_parser import parse_code_with_ast, find_root_dir
+from modules.utils.process_pool_ingest import parse_files_in_processes, extract_record
+from modules.utils.extraction_cache import ExtractionCache
+from modules.utils.file_utils import (
+    serialize_graph_info,
+    append_record_to_log,
+    clear_results_log,
+    compact_results_log,
+)
 
 os.makedirs("outputs", exist_ok=True)
 
-delete_file_content(os.path.join("outputs", "parsed_code.json"))
-
-llm, transformer = get_default_llm_and_transformer()
+# The LLM is initialized on first use so parser-only runs never need it
+llm, transformer = None, None
 
 def check_llm():
     global llm, transformer
+    if llm is None or transformer is None:
+        llm, transformer = get_default_llm_and_transformer()
     if llm is None or transformer is None:
         print("❌ Failed to initialize LLM. Exiting.")
         exit()
     else:
         print("✅ LLM initialized successfully.")
 
-def get_files_from_dir(directories, file_extension=".py"):
-    global llm, transformer
-    check_llm()
-    
+
+def collect_files(directories, file_extension=".py"):
+    """
+    Walk the directories and collect matching files in a stable order
+
+    Args:
+        directories (list): Directories to walk
+        file_extension (str): Extension of the files to collect
+
+    Returns:
+        list: Sorted file paths
+    """
+    file_paths = []
     for dir_name in directories:
         for root, dirs, files in os.walk(dir_name):
-            for file in files:
+            dirs.sort()
+            for file in sorted(files):
                 if file.endswith(file_extension):
-                    file_path = os.path.join(root, file)
-                    try:
-                        result = parse_code_with_llm(file_path, transformer)
-                        if result:
-                            json_file = save_results_to_json(result)
-                            if json_file:
-                                print(f"🔗 You can view the JSON file: {json_file}")
-                                print(
-                                    f"📄 File contains {len(result['nodes'])} nodes and {len(result['relationships'])} relationships"
-                                )
-                            else:
-                                print("❌ Failed to save results to JSON.")
-                        else:
-                            print(f"⚠️ Parsing produced no nodes for {file_path}. Skipping.")
-                    except Exception as e:
-                        print(f"❌ Failed to read {file_path}: {e}")
-                else:
-                    print("❌ No results to save - parsing failed.")
+                    file_paths.append(os.path.join(root, file))
+    return file_paths
+
+
+def parse_file(file_path, cache=None, mode=EXTRACTION_MODE, root_dirs=None):
+    try:
+        if mode == "ast":
+            return parse_code_with_ast(file_path, find_root_dir(file_path, root_dirs))
+
+        result = parse_code_with_llm(file_path, transformer, cache)
+        if mode == "hybrid":
+            structural = parse_code_with_ast(file_path, find_root_dir(file_path, root_dirs))
+            result = merge_graph_results(structural, result)
+        return result
+    except Exception as e:
+        # Failed files are neither cached nor saved, so the next
+        # incremental run picks them up again
+        print(f"❌ Failed to parse {file_path}: {e}")
+        return None
+
+
+def pack_small_files(file_paths, max_files=PACK_MAX_FILES, max_tokens=PACK_MAX_TOKENS):
+    """
+    Group consecutive small files into packs extracted by one LLM request
+
+    Files over LARGE_FILE_THRESHOLD are chunked on their own and stay alone.
+
+    Yields:
+        list: File paths of each pack, in input order
+    """
+    pack, pack_tokens = [], 0
+    for file_path in file_paths:
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        if size > LARGE_FILE_THRESHOLD:
+            if pack:
+                yield pack
+                pack, pack_tokens = [], 0
+            yield [file_path]
+            continue
+        tokens = size // CHARS_PER_TOKEN + 1
+        if pack and (len(pack) >= max_files or pack_tokens + tokens > max_tokens):
+            yield pack
+            pack, pack_tokens = [], 0
+        pack.append(file_path)
+        pack_tokens += tokens
+    if pack:
+        yield pack
+
+
+def parse_file_pack(file_paths, cache=None, mode=EXTRACTION_MODE, root_dirs=None):
+    """
+    Extract a pack of files, falling back to one request per file for the
+    files the packed request produced nothing for
+
+    Returns:
+        list: (file_path, result) pairs in pack order
+    """
+    if len(file_paths) == 1:
+        return [(file_paths[0], parse_file(file_paths[0], cache, mode, root_dirs))]
+
+    try:
+        packed = parse_small_files_packed(file_paths, transformer, cache)
+    except Exception as e:
+        print(f"❌ Failed to parse a pack of {len(file_paths)} files, parsing them one by one: {e}")
+        packed = {}
+
+    results = []
+    for file_path in file_paths:
+        result = packed.get(file_path)
+        if result is None:
+            result = parse_file(file_path, cache, mode, root_dirs)
+        elif mode == "hybrid":
+            try:
+                structural = parse_code_with_ast(file_path, find_root_dir(file_path, root_dirs))
+                result = merge_graph_results(structural, result)
+            except Exception as e:
+                print(f"❌ Failed to parse {file_path}: {e}")
+                result = None
+        results.append((file_path, result))
+    return results
+
+
+def save_parsed_result(file_path, record):
+    if not record:
+        print(f"⚠️ Parsing produced no nodes for {file_path}. Skipping.")
+        return False
+
+    log_file = append_record_to_log(record)
+    if log_file:
+        print(
+            f"📄 {file_path}: {len(record['nodes'])} nodes and {len(record['relationships'])} relationships"
+        )
+        return True
+    else:
+        print("❌ Failed to save results to the log.")
+        return False
+
+
+def bounded_map(executor, func, items, buffer_size=STREAM_BUFFER_SIZE):
+    """
+    Like executor.map, but lazy: at most buffer_size items are submitted
+    ahead of the consumer, so a slow consumer stalls the producers instead
+    of letting results pile up in memory.
+
+    Yields:
+        tuple: (item, result) pairs in input order
+    """
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(func, item)))
+        if len(pending) >= buffer_size:
+            item, future = pending.popleft()
+            yield item, future.result()
+    while pending:
+        item, future = pending.popleft()
+        yield item, future.result()
+
+
+def stream_files(file_paths, max_workers=MAX_CONCURRENT_FILES, mode=EXTRACTION_MODE, root_dirs=None):
+    """
+    Extract files lazily and yield their serialized records in walk order
+
+    Each record is appended to the results log as it is yielded, so the
+    caller only needs compact_results_log once the stream is consumed.
+
+    Args:
+        file_paths (iterable): Files to parse, consumed lazily
+        max_workers (int): Number of files extracted concurrently
+        mode (str): "llm", "ast" or "hybrid", see EXTRACTION_MODE
+        root_dirs (list): Ingested directories, used to name modules
+
+    Yields:
+        dict: Record of each file whose results were saved
+    """
+    cache = None
+    if mode == "ast":
+        # Parser-only extraction is CPU-bound, so it runs in processes
+        extract = partial(extract_record, root_dirs=root_dirs)
+        if INGESTION_PROCESSES == 1:
+            executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            executor = ProcessPoolExecutor(max_workers=INGESTION_PROCESSES)
+    else:
+        check_llm()
+        cache = ExtractionCache(model_name=get_model_name(llm))
+
+        def extract(file_path):
+            result = parse_file(file_path, cache, mode, root_dirs)
+            return serialize_graph_info(result) if result else None
 
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
 
+    # Small files are extracted in packs, one LLM request per pack
+    packing = FILE_PACKING and mode != "ast"
+    if packing:
+        def extract_pack(pack):
+            return [
+                (file_path, serialize_graph_info(result) if result else None)
+                for file_path, result in parse_file_pack(pack, cache, mode, root_dirs)
+            ]
+
+    # Files are extracted concurrently, while the consuming thread is the
+    # single writer and saves records in walk order
+    try:
+        with executor:
+            if packing:
+                pairs = (
+                    pair
+                    for _, pack_results in bounded_map(executor, extract_pack, pack_small_files(file_paths))
+                    for pair in pack_results
+                )
+            else:
+                pairs = bounded_map(executor, extract, file_paths)
+            for file_path, record in pairs:
+                if save_parsed_result(file_path, record):
+                    yield record
+    finally:
+        if cache is not None:
+            stats = cache.stats()
+            print(
+                f"🗃️ Extraction cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate, {stats['size_bytes'] / 1e6:.1f} MB)"
+            )
+            cache.close()
+
+
+def get_files_from_dir(directories, file_extension=".py", max_workers=MAX_CONCURRENT_FILES, mode=EXTRACTION_MODE):
+    file_paths = collect_files(directories, file_extension)
+    if not file_paths:
+        print("❌ No results to save - no matching files found.")
+        return []
+    return parse_files(file_paths, max_workers, mode, root_dirs=directories)
+
+
+def parse_files(file_paths, max_workers=MAX_CONCURRENT_FILES, mode=EXTRACTION_MODE, root_dirs=None):
+    """
+    Extract and save the graph of each file
+
+    Args:
+        file_paths (list): Files to parse
+        max_workers (int): Number of files extracted concurrently
+        mode (str): "llm", "ast" or "hybrid", see EXTRACTION_MODE
+        root_dirs (list): Ingested directories, used to name modules
+
+    Returns:
+        list: Files whose results were saved
+    """
+    # Parser-only extraction is pure Python, so it is spread across cores
+    if mode == "ast" and INGESTION_PROCESSES != 1 and len(file_paths) > 1:
+        return parse_files_in_processes(file_paths, INGESTION_PROCESSES, root_dirs)
+
+    clear_results_log()
+    saved_files = [
+        record["file"] for record in stream_files(file_paths, max_workers, mode, root_dirs)
+    ]
+
+    json_file = compact_results_log()
+    if json_file:
+        print(f"🔗 You can view the JSON file: {json_file}")
+    else:
+        print("❌ Failed to save results to JSON.")
 
+    return saved_files
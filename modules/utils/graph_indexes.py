@@ -0,0 +1,270 @@
+"""
+Derived graph indexes computed after ingestion
+
+Variable-length traversals ("everything reachable from main", "who
+transitively imports this module") time out on large graphs, so the answers
+are precomputed from the parsed graph and stored as node properties:
+
+- call_fan_in / call_fan_out / import_fan_in / import_fan_out: degrees
+- call_scc / call_scc_size: strongly connected component of the call graph
+- import_layer: topological layer of a module, 0 for modules that import
+  no other ingested module, and import_scc for import cycles. Modules only
+  seen as import targets (the standard library, third-party packages) are
+  left out of the layering and have no import_layer
+- call_post / call_reach and import_post / import_reach: interval labels
+  on the condensation DAG; a node reaches another iff the other's *_post
+  falls in one of its [start, end] pairs flattened into *_reach. Those
+  pairs include the node's own post number, so every node matches itself;
+  queries after strict reachability exclude it. Members of one cycle share
+  their post number and do reach each other
+- module_id: the module that CONTAINS the node, directly or transitively
+"""
+
+import time
+from collections import Counter, defaultdict
+
+import networkx as nx
+
+from modules.utils.file_utils import load_json_data
+import modules.utils.neo4j_functions as neo4j_functions
+
+CALL_RELATIONSHIPS = ("CALLS", "INSTANTIATES")
+IMPORT_RELATIONSHIPS = ("IMPORTS",)
+
+def build_digraph(relationships, rel_types):
+    graph = nx.DiGraph()
+    for rel in relationships:
+        if rel["relationship_type"] in rel_types:
+            graph.add_edge(str(rel["source"]["id"]), str(rel["target"]["id"]))
+    return graph
+
+
+def merge_intervals(intervals):
+    """Merge overlapping or adjacent [start, end] intervals"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def compute_interval_labels(dag):
+    """
+    Label a DAG for reachability queries
+
+    Nodes are numbered in DFS post-order over a spanning forest, so each
+    tree subtree is the interval [first post-order number in it, own number].
+    Intervals of successors are then unioned in reverse topological order
+    and merged, giving every node a compressed transitive closure.
+
+    Returns:
+        tuple: ({node: post-order number}, {node: [[start, end], ...]})
+    """
+    post, start = {}, {}
+    counter = 0
+    roots = sorted(n for n in dag if dag.in_degree(n) == 0)
+    for root in roots:
+        if root in start:
+            continue
+        start[root] = counter
+        stack = [(root, iter(sorted(dag.successors(root))))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child not in start:
+                    start[child] = counter
+                    stack.append((child, iter(sorted(dag.successors(child)))))
+                    break
+            else:
+                stack.pop()
+                post[node] = counter
+                counter += 1
+
+    intervals = {}
+    for node in reversed(list(nx.topological_sort(dag))):
+        own = [[start[node], post[node]]]
+        for child in dag.successors(node):
+            own.extend(intervals[child])
+        intervals[node] = merge_intervals(own)
+    return post, intervals
+
+
+def compute_reachability(graph):
+    """
+    Strongly connected components and interval labels of a directed graph
+
+    Returns:
+        dict: {node: {'scc', 'scc_size', 'post', 'reach'}}
+    """
+    condensed = nx.condensation(graph)
+    post, intervals = compute_interval_labels(condensed)
+
+    labels = {}
+    for component, data in condensed.nodes(data=True):
+        reach = [bound for interval in intervals[component] for bound in interval]
+        for node in data["members"]:
+            labels[node] = {
+                "scc": component,
+                "scc_size": len(data["members"]),
+                "post": post[component],
+                "reach": reach,
+            }
+    return labels
+
+
+def compute_layers(graph):
+    """Longest path from every node to a sink of the condensation DAG"""
+    condensed = nx.condensation(graph)
+    layers = {}
+    for component in reversed(list(nx.topological_sort(condensed))):
+        successors = list(condensed.successors(component))
+        layers[component] = 1 + max(layers[s] for s in successors) if successors else 0
+    return {node: layers[component] for node, component in condensed.graph["mapping"].items()}
+
+
+def find_ingested_modules(nodes, relationships):
+    """
+    Modules parsed from an ingested file, as opposed to modules only seen
+    as the target of an import: they carry the file_path of their source
+    or contain definitions
+    """
+    containers = {
+        str(rel["source"]["id"]) for rel in relationships if rel["relationship_type"] == "CONTAINS"
+    }
+    return {
+        str(n["id"]) for n in nodes
+        if n["type"] == "Module"
+        and ("file_path" in n.get("properties", {}) or str(n["id"]) in containers)
+    }
+
+
+def compute_module_ids(nodes, relationships):
+    """Map every node to the module that contains it through CONTAINS edges"""
+    node_types = {str(n["id"]): n["type"] for n in nodes}
+    parents = {}
+    for rel in relationships:
+        if rel["relationship_type"] == "CONTAINS":
+            parents.setdefault(str(rel["target"]["id"]), str(rel["source"]["id"]))
+
+    module_ids = {}
+    for node_id, node_type in node_types.items():
+        # Walk up the containment chain until a module or a known answer
+        path, current = [], node_id
+        while (
+            current is not None
+            and current not in module_ids
+            and node_types.get(current) != "Module"
+            and current not in path
+        ):
+            path.append(current)
+            current = parents.get(current)
+
+        if current is None or current in path:
+            module_id = None
+        else:
+            module_id = module_ids.get(current, current)
+        for visited in path:
+            module_ids[visited] = module_id
+        if node_type == "Module":
+            module_ids[node_id] = node_id
+    return module_ids
+
+
+def compute_derived_indexes(data):
+    """
+    Compute the derived properties of every node of a parsed graph
+
+    Args:
+        data (dict): Parsed JSON data with 'nodes' and 'relationships'
+
+    Returns:
+        dict: {node id: {property: value}}; properties that do not apply
+            to a node are None, so a re-run clears stale values in Neo4j
+    """
+    nodes = data.get("nodes", [])
+    relationships = data.get("relationships", [])
+
+    call_graph = build_digraph(relationships, CALL_RELATIONSHIPS)
+    import_graph = build_digraph(relationships, IMPORT_RELATIONSHIPS)
+    call_labels = compute_reachability(call_graph)
+    import_labels = compute_reachability(import_graph)
+    import_layers = compute_layers(
+        import_graph.subgraph(find_ingested_modules(nodes, relationships) & set(import_graph))
+    )
+    module_ids = compute_module_ids(nodes, relationships)
+
+    derived = {}
+    for node in nodes:
+        node_id = str(node["id"])
+        calls = call_labels.get(node_id, {})
+        imports = import_labels.get(node_id, {})
+        derived[node_id] = {
+            "call_fan_in": call_graph.in_degree(node_id) if node_id in call_graph else 0,
+            "call_fan_out": call_graph.out_degree(node_id) if node_id in call_graph else 0,
+            "import_fan_in": import_graph.in_degree(node_id) if node_id in import_graph else 0,
+            "import_fan_out": import_graph.out_degree(node_id) if node_id in import_graph else 0,
+            "call_scc": calls.get("scc"),
+            "call_scc_size": calls.get("scc_size"),
+            "call_post": calls.get("post"),
+            "call_reach": calls.get("reach"),
+            "import_scc": imports.get("scc"),
+            "import_layer": import_layers.get(node_id),
+            "import_post": imports.get("post"),
+            "import_reach": imports.get("reach"),
+            "module_id": module_ids.get(node_id),
+        }
+    return derived
+
+
+def computing_derived_indexes(json_file):
+    """
+    Compute the derived indexes of a parsed JSON file
+
+    Returns:
+        tuple: (parsed data, derived indexes) or None if there is no graph
+    """
+    data = load_json_data(json_file)
+    if not data or not data.get("nodes"):
+        print("⚠️ No parsed graph to derive indexes from.")
+        return None
+
+    started = time.perf_counter()
+    derived = compute_derived_indexes(data)
+    print(f"🧮 Derived indexes computed in {time.perf_counter() - started:.1f}s")
+    return data, derived
+
+
+def saving_derived_indexes_to_neo4j(json_file):
+    """
+    Compute the derived indexes of the parsed graph and store them on the
+    Neo4j nodes, batched per label so every MATCH uses the id constraint
+
+    Returns:
+        dict: The derived indexes, None if there is no graph
+    """
+    computed = computing_derived_indexes(json_file)
+    if computed is None:
+        return None
+    data, derived = computed
+
+    rows_by_label = defaultdict(list)
+    for node in data["nodes"]:
+        node_id = str(node["id"])
+        rows_by_label[node["type"]].append({"id": node_id, "props": derived[node_id]})
+
+    started = time.perf_counter()
+    written = Counter()
+    for label, rows in rows_by_label.items():
+        cypher = f"""
+            UNWIND $rows AS row
+            MATCH (n:{neo4j_functions.quote_identifier(label)} {{id: row.id}})
+            SET n += row.props
+        """
+        written += neo4j_functions.run_in_batches(
+            neo4j_functions.get_driver(), cypher, rows, f"'{label}' derived indexes"
+        )
+    neo4j_functions.report_throughput(written, len(derived), "derived indexes", started)
+    return derived
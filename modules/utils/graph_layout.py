@@ -0,0 +1,138 @@
+"""
+Server-side layout of the parsed graph
+
+Coordinates are computed once per ingestion so the visualizer can render
+with physics disabled instead of running a force simulation in the browser
+on every page load. The layout is hierarchical and deterministic:
+
+- modules are placed in columns by their import layer (from the condensed
+  IMPORTS graph), so dependencies read left to right
+- the members of a module are placed on a sunflower spiral around it, and
+  every module gets room for its own spiral
+
+Positions are stored on the Neo4j nodes (layout_x, layout_y) and in
+GRAPH_LAYOUT_FILE for the in-memory backend.
+"""
+
+import math
+import time
+from collections import Counter, defaultdict
+
+from modules.utils.file_utils import load_json_data, save_graph_layout
+from modules.utils.graph_indexes import (
+    IMPORT_RELATIONSHIPS,
+    build_digraph,
+    compute_module_ids,
+    compute_reachability,
+)
+import modules.utils.neo4j_functions as neo4j_functions
+
+# Distance between neighboring members on a spiral, in vis.js pixels
+MEMBER_SPACING = 40
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+
+def get_spiral_radius(count):
+    return MEMBER_SPACING * math.sqrt(count + 1)
+
+
+def place_on_spiral(center, members, positions):
+    cx, cy = center
+    for i, member in enumerate(members, start=1):
+        radius = MEMBER_SPACING * math.sqrt(i)
+        angle = i * GOLDEN_ANGLE
+        positions[member] = (round(cx + radius * math.cos(angle), 1), round(cy + radius * math.sin(angle), 1))
+
+
+def compute_layout(data):
+    """
+    Compute the position of every node of a parsed graph
+
+    Args:
+        data (dict): Parsed JSON data with 'nodes' and 'relationships'
+
+    Returns:
+        dict: {node id: (x, y)}
+    """
+    nodes = data.get("nodes", [])
+    relationships = data.get("relationships", [])
+    module_ids = compute_module_ids(nodes, relationships)
+
+    members = defaultdict(list)
+    for node in sorted(nodes, key=lambda n: str(n["id"])):
+        node_id = str(node["id"])
+        module_id = module_ids.get(node_id)
+        if module_id != node_id:
+            members[module_id].append(node_id)
+
+    modules = sorted(str(n["id"]) for n in nodes if n["type"] == "Module")
+    import_labels = compute_reachability(build_digraph(relationships, IMPORT_RELATIONSHIPS))
+
+    # Higher layers import lower ones; draw the most depended-on modules last
+    columns = defaultdict(list)
+    for module in modules:
+        columns[import_labels.get(module, {}).get("layer", 0)].append(module)
+    if members.get(None):
+        columns[max(columns, default=-1) + 1].append(None)
+
+    positions = {}
+    x = 0.0
+    for layer in sorted(columns, reverse=True):
+        column = columns[layer]
+        radii = [get_spiral_radius(len(members.get(m, []))) for m in column]
+        width = max(radii)
+        x += width
+        y = -sum(2 * r for r in radii) / 2
+        for module, radius in zip(column, radii):
+            y += radius
+            if module is not None:
+                positions[module] = (round(x, 1), round(y, 1))
+            place_on_spiral((x, y), members.get(module, []), positions)
+            y += radius
+        x += width
+    return positions
+
+
+def computing_layout(json_file):
+    """
+    Compute the layout of a parsed JSON file and save it to GRAPH_LAYOUT_FILE
+
+    Returns:
+        tuple: (parsed data, positions) or None if there is no graph
+    """
+    data = load_json_data(json_file)
+    if not data or not data.get("nodes"):
+        print("⚠️ No parsed graph to lay out.")
+        return None
+
+    started = time.perf_counter()
+    positions = compute_layout(data)
+    save_graph_layout(positions)
+    print(f"📐 Layout computed in {time.perf_counter() - started:.1f}s")
+    return data, positions
+
+
+def saving_layout_to_neo4j(json_file):
+    """Compute the layout of the parsed graph and store it on the nodes"""
+    computed = computing_layout(json_file)
+    if computed is None:
+        return
+    data, positions = computed
+
+    rows_by_label = defaultdict(list)
+    for node in data["nodes"]:
+        x, y = positions[str(node["id"])]
+        rows_by_label[node["type"]].append({"id": str(node["id"]), "x": x, "y": y})
+
+    started = time.perf_counter()
+    written = Counter()
+    for label, rows in rows_by_label.items():
+        cypher = f"""
+            UNWIND $rows AS row
+            MATCH (n:{neo4j_functions.quote_identifier(label)} {{id: row.id}})
+            SET n.layout_x = row.x, n.layout_y = row.y
+        """
+        written += neo4j_functions.run_in_batches(
+            neo4j_functions.get_driver(), cypher, rows, f"'{label}' positions"
+        )
+    neo4j_functions.report_throughput(written, len(positions), "positions", started)
@@ -0,0 +1,172 @@
+"""
+Columnar snapshot of the parsed graph for the analytics dashboard
+
+Ingestion writes the nodes and relationships of outputs/parsed_code.json as
+Parquet files with one column per property (properties.<key>), so the
+dashboard can read only the columns it needs and aggregate them with
+vectorized pandas operations instead of parsing the whole JSON.
+"""
+
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from modules.config.config import GRAPH_SNAPSHOT_DIR
+from modules.utils.file_utils import load_json_data
+from modules.utils.graph_version import get_graph_version
+
+NODES_FILE = "nodes.parquet"
+RELATIONSHIPS_FILE = "relationships.parquet"
+METADATA_FILE = "metadata.json"
+
+
+def flatten_properties(records, columns):
+    """
+    Build property columns for a list of records
+
+    Scalars are kept as is, lists and dicts are stored as JSON text, and a
+    column mixing value types is stored as text so it fits one Parquet type.
+    """
+    keys = sorted({k for record in records for k in record.get("properties", {})})
+    for key in keys:
+        values = [record.get("properties", {}).get(key) for record in records]
+        values = [
+            json.dumps(v, default=str) if isinstance(v, (list, dict, tuple)) else v
+            for v in values
+        ]
+        value_types = {type(v) for v in values if v is not None}
+        if len(value_types) > 1:
+            values = [None if v is None else str(v) for v in values]
+        columns[f"properties.{key}"] = values
+    return columns
+
+
+def build_node_frame(nodes):
+    columns = {
+        "id": [str(n.get("id")) for n in nodes],
+        "type": [n.get("type") for n in nodes],
+    }
+    return pd.DataFrame(flatten_properties(nodes, columns))
+
+
+def build_relationship_frame(relationships):
+    columns = {
+        "source_id": [str(r["source"]["id"]) for r in relationships],
+        "source_type": [r["source"]["type"] for r in relationships],
+        "target_id": [str(r["target"]["id"]) for r in relationships],
+        "target_type": [r["target"]["type"] for r in relationships],
+        "relationship_type": [r["relationship_type"] for r in relationships],
+    }
+    return pd.DataFrame(flatten_properties(relationships, columns))
+
+
+def write_graph_snapshot(json_file, snapshot_dir=GRAPH_SNAPSHOT_DIR, derived=None):
+    """
+    Write the columnar snapshot of a parsed JSON file
+
+    Args:
+        json_file (str): Parsed JSON file
+        snapshot_dir (str): Directory of the Parquet files
+        derived (dict): Derived indexes from modules.utils.graph_indexes,
+            stored as properties.<index> columns like on the Neo4j nodes
+
+    Returns:
+        str: Snapshot directory or None if error
+    """
+    data = load_json_data(json_file)
+    if not data:
+        print("⚠️ No parsed graph to snapshot.")
+        return None
+
+    nodes = data.get("nodes", [])
+    if derived:
+        nodes = [
+            {**node, "properties": {**node.get("properties", {}), **derived.get(str(node["id"]), {})}}
+            for node in nodes
+        ]
+
+    started = time.perf_counter()
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        build_node_frame(nodes).to_parquet(
+            os.path.join(snapshot_dir, NODES_FILE), index=False
+        )
+        build_relationship_frame(data.get("relationships", [])).to_parquet(
+            os.path.join(snapshot_dir, RELATIONSHIPS_FILE), index=False
+        )
+        metadata = {
+            "node_count": len(data.get("nodes", [])),
+            "relationship_count": len(data.get("relationships", [])),
+            "processed_file_count": len(data.get("processed_files", [])),
+            "source_mtime": os.path.getmtime(json_file),
+        }
+        with open(os.path.join(snapshot_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+    except Exception as e:
+        print(f"❌ Error writing the graph snapshot: {e}")
+        return None
+
+    print(f"🧊 Graph snapshot written in {time.perf_counter() - started:.1f}s")
+    return snapshot_dir
+
+
+def get_snapshot_key(json_file, snapshot_dir=GRAPH_SNAPSHOT_DIR):
+    """Cache key that changes whenever a new snapshot or ingestion lands"""
+    metadata_file = os.path.join(snapshot_dir, METADATA_FILE)
+    try:
+        snapshot_mtime = os.path.getmtime(metadata_file)
+    except OSError:
+        snapshot_mtime = None
+    try:
+        json_mtime = os.path.getmtime(json_file)
+    except OSError:
+        json_mtime = None
+    return get_graph_version(), snapshot_mtime, json_mtime
+
+
+def load_graph_snapshot(json_file, node_columns=None, relationship_columns=None, snapshot_dir=GRAPH_SNAPSHOT_DIR):
+    """
+    Read the snapshot, rebuilding it first if it is missing or older than
+    the parsed JSON file
+
+    Args:
+        json_file (str): Parsed JSON file the snapshot is built from
+        node_columns (list): Node columns to read, None for all
+        relationship_columns (list): Relationship columns to read, None for all
+
+    Returns:
+        tuple: (nodes DataFrame, relationships DataFrame, metadata dict), or
+            None if there is no parsed graph
+    """
+    metadata_file = os.path.join(snapshot_dir, METADATA_FILE)
+    metadata = None
+    if os.path.exists(metadata_file):
+        with open(metadata_file, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+    stale = (
+        metadata is None
+        or not os.path.exists(json_file)
+        or metadata.get("source_mtime") != os.path.getmtime(json_file)
+    )
+    if stale:
+        if not os.path.exists(json_file) or not write_graph_snapshot(json_file, snapshot_dir):
+            return None
+        with open(metadata_file, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+    def read(file_name, columns):
+        path = os.path.join(snapshot_dir, file_name)
+        if columns is not None:
+            # A property column only exists if some record had the property
+            available = set(pq.read_schema(path).names)
+            columns = [c for c in columns if c in available]
+        return pd.read_parquet(path, columns=columns)
+
+    nodes = read(NODES_FILE, node_columns)
+    relationships = read(RELATIONSHIPS_FILE, relationship_columns)
+    return nodes, relationships, metadata
+
@@ -0,0 +1,353 @@
+"""
+In-memory graph store built from the parsed graph
+
+A read-only, in-process alternative to Neo4j for the visualizer and the
+analytics pages. Node ids are interned to consecutive integers and every
+relationship type is stored as CSR adjacency arrays in both directions, so
+a neighbor lookup is an array slice and a k-hop expansion never leaves the
+process. Nothing here needs a running database.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from modules.utils.file_utils import load_json_data, load_graph_layout
+from modules.utils.graph_version import get_graph_version
+
+
+def build_csr(sources, targets, node_count):
+    """
+    Build CSR arrays for edges given as parallel source/target arrays
+
+    Returns:
+        tuple: (indptr, indices, order) where the neighbors of u are
+            indices[indptr[u]:indptr[u + 1]] and order maps CSR positions
+            back to edge numbers
+    """
+    order = np.argsort(sources, kind="stable")
+    counts = np.bincount(sources, minlength=node_count)
+    indptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, targets[order], order
+
+
+class GraphStore:
+    """
+    Compact read-only graph with integer-interned ids
+
+    Attributes:
+        ids (list): Original node id of every interned node
+        names (list): Display name of every node
+        labels (list): Label of every node
+        file_paths (list): Source file of every node, None if unknown
+        processed_file_count (int): Number of files the graph was parsed from
+        edge_sources, edge_targets (np.ndarray): Endpoints of every edge
+        edge_types (np.ndarray): Index into rel_types of every edge
+    """
+
+    def __init__(self, nodes, relationships, positions=None, processed_file_count=0):
+        self.index = {}
+        self.ids, self.names, self.labels, self.file_paths = [], [], [], []
+        self.processed_file_count = processed_file_count
+        for node in nodes:
+            node_id = str(node["id"])
+            if node_id in self.index:
+                continue
+            self.index[node_id] = len(self.ids)
+            self.ids.append(node_id)
+            self.names.append(node.get("properties", {}).get("name", node_id))
+            self.labels.append(node["type"])
+            self.file_paths.append(node.get("properties", {}).get("file_path"))
+
+        # Precomputed layout coordinates, None where a node has no position
+        positions = positions or {}
+        self.positions = [positions.get(node_id) for node_id in self.ids]
+
+        label_members = {}
+        for position, label in enumerate(self.labels):
+            label_members.setdefault(label, []).append(position)
+        self.label_index = {
+            label: np.array(members, dtype=np.int64) for label, members in label_members.items()
+        }
+
+        # Like the Neo4j savers, relationships whose endpoints are not nodes
+        # of the graph are dropped
+        sources, targets, types = [], [], []
+        self.rel_types = []
+        rel_type_index = {}
+        for rel in relationships:
+            source = self.index.get(str(rel["source"]["id"]))
+            target = self.index.get(str(rel["target"]["id"]))
+            if source is None or target is None:
+                continue
+            rel_type = rel["relationship_type"]
+            if rel_type not in rel_type_index:
+                rel_type_index[rel_type] = len(self.rel_types)
+                self.rel_types.append(rel_type)
+            sources.append(source)
+            targets.append(target)
+            types.append(rel_type_index[rel_type])
+
+        self.edge_sources = np.array(sources, dtype=np.int64)
+        self.edge_targets = np.array(targets, dtype=np.int64)
+        self.edge_types = np.array(types, dtype=np.int64)
+
+        node_count = len(self.ids)
+        self._module_index = None
+        self.outgoing, self.incoming = {}, {}
+        for type_index, rel_type in enumerate(self.rel_types):
+            mask = self.edge_types == type_index
+            src, tgt = self.edge_sources[mask], self.edge_targets[mask]
+            self.outgoing[rel_type] = build_csr(src, tgt, node_count)
+            self.incoming[rel_type] = build_csr(tgt, src, node_count)
+
+    @classmethod
+    def from_json(cls, json_file, positions=None):
+        data = load_json_data(json_file) or {}
+        return cls(
+            data.get("nodes", []),
+            data.get("relationships", []),
+            positions,
+            len(data.get("processed_files", [])),
+        )
+
+    @property
+    def node_count(self):
+        return len(self.ids)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_sources)
+
+    def node_record(self, position):
+        record = {"node_id": position, "name": self.names[position], "label": self.labels[position]}
+        if self.positions[position] is not None:
+            record["x"], record["y"] = self.positions[position]
+        return record
+
+    def edge_record(self, source, target, rel_type):
+        return {
+            "source_id": source,
+            "source_name": self.names[source],
+            "source_label": self.labels[source],
+            "target_id": target,
+            "target_name": self.names[target],
+            "target_label": self.labels[target],
+            "relation": rel_type,
+        }
+
+    def all_nodes(self):
+        """Every node, in the format of nodes_fromdb.fetch_all_nodes"""
+        return [self.node_record(position) for position in range(self.node_count)]
+
+    def all_edges(self):
+        """Every edge, in the format of nodes_fromdb.get_full_codebase"""
+        return [
+            self.edge_record(int(s), int(t), self.rel_types[k])
+            for s, t, k in zip(self.edge_sources, self.edge_targets, self.edge_types)
+        ]
+
+    def nodes_with_label(self, label):
+        """Interned positions of the nodes with a label"""
+        return self.label_index.get(label, np.empty(0, dtype=np.int64))
+
+    def neighbors(self, position, rel_types=None, direction="out"):
+        """
+        Neighbors of an interned node
+
+        Args:
+            position (int): Interned node
+            rel_types (list): Relationship types to follow, None for all
+            direction (str): "out", "in" or "both"
+
+        Returns:
+            np.ndarray: Interned positions of the neighbors
+        """
+        adjacency = []
+        if direction in ("out", "both"):
+            adjacency.append(self.outgoing)
+        if direction in ("in", "both"):
+            adjacency.append(self.incoming)
+
+        parts = []
+        for csr in adjacency:
+            for rel_type in rel_types or self.rel_types:
+                if rel_type in csr:
+                    indptr, indices, _ = csr[rel_type]
+                    parts.append(indices[indptr[position]:indptr[position + 1]])
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def k_hop_subgraph(self, seeds, k, rel_types=None, direction="both", max_nodes=None):
+        """
+        Nodes within k hops of the seeds and the edges between them
+
+        Args:
+            seeds (iterable): Interned positions to start from
+            k (int): Number of hops
+            rel_types (list): Relationship types to follow, None for all
+            direction (str): "out", "in" or "both"
+            max_nodes (int): Stop expanding once this many nodes are reached
+
+        Returns:
+            tuple: (list of node records, list of edge records)
+        """
+        visited = np.zeros(self.node_count, dtype=bool)
+        frontier = np.unique(np.asarray(list(seeds), dtype=np.int64))
+        visited[frontier] = True
+        for _ in range(k):
+            if max_nodes is not None and visited.sum() >= max_nodes:
+                break
+            reached = [self.neighbors(int(u), rel_types, direction) for u in frontier]
+            if not reached:
+                break
+            candidates = np.unique(np.concatenate(reached))
+            frontier = candidates[~visited[candidates]]
+            if max_nodes is not None:
+                frontier = frontier[: max(0, max_nodes - int(visited.sum()))]
+            visited[frontier] = True
+
+        selected = np.flatnonzero(visited)
+        mask = visited[self.edge_sources] & visited[self.edge_targets]
+        if rel_types is not None:
+            allowed = [self.rel_types.index(r) for r in rel_types if r in self.rel_types]
+            mask &= np.isin(self.edge_types, allowed)
+        edges = [
+            self.edge_record(int(s), int(t), self.rel_types[k])
+            for s, t, k in zip(
+                self.edge_sources[mask], self.edge_targets[mask], self.edge_types[mask]
+            )
+        ]
+        return [self.node_record(int(p)) for p in selected], edges
+
+    def module_index(self):
+        """
+        Interned position of the module containing every node, following
+        CONTAINS edges up to a Module; -1 for nodes outside any module
+        """
+        if self._module_index is not None:
+            return self._module_index
+
+        node_count = self.node_count
+        # parent[u] is the container of u; the extra last slot is "no module"
+        parent = np.full(node_count + 1, node_count, dtype=np.int64)
+        if "CONTAINS" in self.incoming:
+            indptr, indices, _ = self.incoming["CONTAINS"]
+            has_parent = np.flatnonzero(np.diff(indptr) > 0)
+            parent[has_parent] = indices[indptr[has_parent]]
+        modules = self.nodes_with_label("Module")
+        parent[modules] = modules
+
+        # Pointer jumping: every pass doubles the followed chain length
+        for _ in range(64):
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+
+        module_index = parent[:node_count]
+        is_module = np.zeros(node_count + 1, dtype=bool)
+        is_module[modules] = True
+        module_index = np.where(is_module[module_index], module_index, -1)
+        self._module_index = module_index
+        return module_index
+
+    def module_overview(self, unassigned_id=None):
+        """
+        Aggregate the graph to one node per module
+
+        Args:
+            unassigned_id (str): Id of a bucket node for the nodes outside
+                any module, None to leave them out
+
+        Returns:
+            tuple: (module records {'id', 'name', 'label', 'size'}, edge
+                records {'source', 'target', 'relation', 'weight'})
+        """
+        module_index = self.module_index()
+        inside = module_index >= 0
+        sizes = np.bincount(module_index[inside], minlength=self.node_count)
+        modules = self.nodes_with_label("Module")
+        nodes = [
+            {
+                "id": self.ids[m],
+                "name": self.names[m],
+                "label": "Module",
+                "size": int(sizes[m]),
+                "x": (self.positions[m] or (None, None))[0],
+                "y": (self.positions[m] or (None, None))[1],
+            }
+            for m in modules
+        ]
+
+        outside = np.flatnonzero(~inside)
+        if unassigned_id is not None and len(outside):
+            # The bucket sits at the centroid of its nodes, like a package
+            positions = [self.positions[p] for p in outside if self.positions[p]]
+            x, y = np.mean(positions, axis=0).tolist() if positions else (None, None)
+            nodes.append(
+                {"id": unassigned_id, "name": "Unassigned", "label": "Unassigned",
+                 "size": len(outside), "x": x, "y": y}
+            )
+
+        sources = module_index[self.edge_sources]
+        targets = module_index[self.edge_targets]
+        mask = sources != targets
+        if unassigned_id is None:
+            mask &= (sources >= 0) & (targets >= 0)
+        if not mask.any():
+            return nodes, []
+        triples = np.stack([sources[mask], targets[mask], self.edge_types[mask]], axis=1)
+        unique, counts = np.unique(triples, axis=0, return_counts=True)
+
+        def get_module_id(position):
+            return self.ids[position] if position >= 0 else unassigned_id
+
+        edges = [
+            {
+                "source": get_module_id(s),
+                "target": get_module_id(t),
+                "relation": self.rel_types[k],
+                "weight": int(c),
+            }
+            for (s, t, k), c in zip(unique, counts)
+        ]
+        return nodes, edges
+
+    def module_subgraph(self, module_id, hops=1, max_nodes=None):
+        """Members of a module plus their k-hop neighborhood"""
+        position = self.find(module_id)
+        if position is None:
+            return [], []
+        seeds = np.flatnonzero(self.module_index() == position)
+        if max_nodes is not None:
+            seeds = seeds[:max_nodes]
+        return self.k_hop_subgraph(seeds, hops, max_nodes=max_nodes)
+
+    def find(self, node_id):
+        """Interned position of an original node id, or None"""
+        return self.index.get(str(node_id))
+
+
+_store = None
+_store_key = None
+_store_lock = threading.Lock()
+
+
+def get_graph_store(json_file=os.path.join("outputs", "parsed_code.json")):
+    """
+    Return the in-memory store of the parsed graph, rebuilt only when a new
+    ingestion bumped the graph version or rewrote the JSON file
+    """
+    global _store, _store_key
+    try:
+        mtime = os.path.getmtime(json_file)
+    except OSError:
+        mtime = None
+    key = (json_file, get_graph_version(), mtime)
+    with _store_lock:
+        if _store is None or key != _store_key:
+            _store = GraphStore.from_json(json_file, load_graph_layout())
+            _store_key = key
+        return _store
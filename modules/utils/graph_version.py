@@ -0,0 +1,42 @@
+"""
+Graph version counter shared by ingestion and the read side
+
+Ingestion bumps the version once the graph is written. Long-lived readers
+(query service, caches, frontend) compare the version they were built for
+against the current one to know when their snapshot is stale. The counter
+lives in a small JSON file so it is shared across processes.
+"""
+
+import json
+import os
+from datetime import datetime
+
+from modules.config.config import GRAPH_VERSION_FILE
+
+
+def get_graph_version(version_file=GRAPH_VERSION_FILE):
+    """
+    Returns:
+        int: Current graph version, 0 if nothing has been ingested yet
+    """
+    try:
+        with open(version_file, "r", encoding="utf-8") as f:
+            return int(json.load(f).get("version", 0))
+    except (FileNotFoundError, ValueError, json.JSONDecodeError):
+        return 0
+
+
+def bump_graph_version(version_file=GRAPH_VERSION_FILE):
+    """
+    Mark the graph as changed
+
+    Returns:
+        int: New graph version
+    """
+    version = get_graph_version(version_file) + 1
+    os.makedirs(os.path.dirname(version_file), exist_ok=True)
+    temp_file = version_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "updated_at": datetime.now().isoformat()}, f)
+    os.replace(temp_file, version_file)
+    return version
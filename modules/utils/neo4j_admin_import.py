@@ -0,0 +1,238 @@
+"""
+Offline bulk import for first-time loads of very large graphs
+
+Exports the merged parsed_code.json graph into the header and data CSV
+files taken by `neo4j-admin database import full`, and drives the import
+into a fresh (stopped) database. Incremental and online loads go through
+modules.utils.neo4j_functions instead.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import subprocess
+from collections import defaultdict
+
+from modules.config.config import NEO4J_ADMIN_IMPORT_DIR, NEO4J_ADMIN_PATH
+from modules.utils.graph_version import bump_graph_version
+from modules.utils.neo4j_functions import sanitize_properties
+
+# Unit separator: neo4j-admin takes it as U+001F, and source code values
+# practically never contain it (columns where one does fall back to JSON)
+ARRAY_DELIMITER = "\x1f"
+ARRAY_DELIMITER_OPTION = "U+001F"
+ARRAY_TYPES = {str: ":string[]", bool: ":boolean[]", int: ":long[]", float: ":double[]"}
+
+
+def get_property_type(values):
+    """
+    Pick the neo4j-admin header type of a property from its values
+
+    Args:
+        values (list): Non-null values of the property, already converted
+            with to_neo4j_property
+
+    Returns:
+        str: Header type suffix such as ':long' or ':string[]', '' for strings
+    """
+    if all(isinstance(v, list) for v in values):
+        element_types = {type(e) for v in values for e in v}
+        if not element_types:
+            return ":string[]"
+        if len(element_types) == 1 and not any(
+            ARRAY_DELIMITER in e for v in values for e in v if isinstance(e, str)
+        ):
+            return ARRAY_TYPES[element_types.pop()]
+        return ""
+    if all(isinstance(v, bool) for v in values):
+        return ":boolean"
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return ":long"
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return ":double"
+    return ""
+
+
+def format_value(value, property_type):
+    if value is None:
+        return ""
+    if property_type.endswith("[]"):
+        return ARRAY_DELIMITER.join(format_value(v, property_type[:-2]) for v in value)
+    if property_type == ":boolean":
+        return "true" if value else "false"
+    if property_type in (":long", ":double"):
+        return str(value)
+    return value if isinstance(value, str) else json.dumps(value, default=str)
+
+
+def get_property_columns(records):
+    """Collect the property keys of the records with their header types"""
+    values = defaultdict(list)
+    for props in records:
+        for key, value in props.items():
+            if value is not None:
+                values[key].append(value)
+    return [(key, get_property_type(values[key])) for key in sorted(values)]
+
+
+def safe_file_name(name):
+    return re.sub(r"[^A-Za-z0-9_]+", "_", str(name)).strip("_") or "unnamed"
+
+
+def write_csv_pair(output_dir, prefix, header, rows):
+    """
+    Write a header file and a headerless data file
+
+    Returns:
+        tuple: (header_path, data_path)
+    """
+    header_path = os.path.join(output_dir, f"{prefix}_header.csv")
+    data_path = os.path.join(output_dir, f"{prefix}.csv")
+
+    with open(header_path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerow(header)
+    with open(data_path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(rows)
+
+    return header_path, data_path
+
+
+def export_for_admin_import(json_file=os.path.join("outputs", "parsed_code.json"), output_dir=NEO4J_ADMIN_IMPORT_DIR):
+    """
+    Export the parsed graph as neo4j-admin import CSV files
+
+    Every label gets its own id space, so the same id may be used by nodes of
+    different labels. Relationships whose endpoints are not in the graph are
+    skipped, matching the online loader which only links existing nodes.
+
+    Args:
+        json_file (str): Path to the merged parsed JSON file
+        output_dir (str): Directory for the CSV files
+
+    Returns:
+        dict: {'nodes': [(header, data), ...], 'relationships': [(header, data), ...]}
+    """
+    with open(json_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    os.makedirs(output_dir, exist_ok=True)
+    for name in os.listdir(output_dir):
+        if name.endswith(".csv"):
+            os.remove(os.path.join(output_dir, name))
+
+    nodes_by_label = defaultdict(dict)
+    for node in data.get("nodes", []):
+        label = node["type"]
+        node_id = str(node["id"])
+        # Same property conversion as the online loader, so both loads
+        # produce the same property types
+        props = sanitize_properties(node.get("properties", {}))
+        props.pop("id", None)
+        props["type"] = label
+        props.setdefault("name", node_id)
+        nodes_by_label[label][node_id] = props
+
+    exported = {"nodes": [], "relationships": []}
+
+    for index, (label, nodes) in enumerate(sorted(nodes_by_label.items())):
+        columns = get_property_columns(nodes.values())
+        header = [f"id:ID({label})", ":LABEL"] + [f"{key}{t}" for key, t in columns]
+        rows = (
+            [node_id, label] + [format_value(props.get(key), t) for key, t in columns]
+            for node_id, props in nodes.items()
+        )
+        exported["nodes"].append(
+            write_csv_pair(output_dir, f"nodes_{index}_{safe_file_name(label)}", header, rows)
+        )
+
+    rels_by_type = defaultdict(dict)
+    skipped = 0
+    for rel in data.get("relationships", []):
+        source_type, target_type = rel["source"]["type"], rel["target"]["type"]
+        source_id, target_id = str(rel["source"]["id"]), str(rel["target"]["id"])
+        if source_id not in nodes_by_label.get(source_type, {}) or target_id not in nodes_by_label.get(target_type, {}):
+            skipped += 1
+            continue
+        key = (source_type, rel["relationship_type"], target_type)
+        rels_by_type[key][(source_id, target_id)] = sanitize_properties(rel.get("properties", {}))
+
+    for index, ((source_type, rel_type, target_type), rels) in enumerate(sorted(rels_by_type.items())):
+        columns = get_property_columns(rels.values())
+        header = [f":START_ID({source_type})", f":END_ID({target_type})", ":TYPE"] + [
+            f"{key}{t}" for key, t in columns
+        ]
+        rows = (
+            [source_id, target_id, rel_type] + [format_value(props.get(key), t) for key, t in columns]
+            for (source_id, target_id), props in rels.items()
+        )
+        exported["relationships"].append(
+            write_csv_pair(output_dir, f"relationships_{index}_{safe_file_name(rel_type)}", header, rows)
+        )
+
+    print(
+        f"📦 Exported {sum(len(n) for n in nodes_by_label.values())} nodes and "
+        f"{sum(len(r) for r in rels_by_type.values())} relationships to {output_dir}"
+    )
+    if skipped:
+        print(f"⚠️ Skipped {skipped} relationships with missing endpoints")
+
+    return exported
+
+
+def build_admin_import_command(exported, database="neo4j", neo4j_admin=NEO4J_ADMIN_PATH):
+    command = [
+        neo4j_admin,
+        "database",
+        "import",
+        "full",
+        "--overwrite-destination=true",
+        "--multiline-fields=true",
+        f"--array-delimiter={ARRAY_DELIMITER_OPTION}",
+    ]
+    command += [f"--nodes={header},{data}" for header, data in exported["nodes"]]
+    command += [f"--relationships={header},{data}" for header, data in exported["relationships"]]
+    command.append(database)
+    return command
+
+
+def run_admin_import(exported, database="neo4j", neo4j_admin=NEO4J_ADMIN_PATH):
+    """
+    Import the exported CSV files into a fresh database with neo4j-admin
+
+    The target database must be stopped; its existing content is replaced.
+
+    Returns:
+        bool: True if the import succeeded
+    """
+    command = build_admin_import_command(exported, database, neo4j_admin)
+    print(f"🚚 Running offline import into database '{database}'...")
+    try:
+        result = subprocess.run(command, capture_output=True, text=True)
+    except FileNotFoundError:
+        print(f"❌ {neo4j_admin} not found. Set NEO4J_ADMIN_PATH in the config to the neo4j-admin executable.")
+        return False
+
+    if result.returncode != 0:
+        print(f"❌ neo4j-admin import failed:\n{result.stderr}")
+        return False
+
+    print(result.stdout)
+    # The query, result and visualizer caches still hold the old graph
+    bump_graph_version()
+    print(f"✅ Offline import into '{database}' completed. Start the database to query it.")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline neo4j-admin import of the parsed code graph")
+    parser.add_argument("--json-file", default=os.path.join("outputs", "parsed_code.json"))
+    parser.add_argument("--output-dir", default=NEO4J_ADMIN_IMPORT_DIR)
+    parser.add_argument("--database", default=os.getenv("NEO4J_DATABASE") or "neo4j")
+    parser.add_argument("--export-only", action="store_true", help="Only write the CSV files")
+    args = parser.parse_args()
+
+    exported = export_for_admin_import(args.json_file, args.output_dir)
+    if not args.export_only:
+        run_admin_import(exported, args.database)
@@ -0,0 +1,131 @@
+"""
+Async Neo4j access path for the Streamlit pages and the Query Bot
+
+Streamlit runs every script run on a thread of its own, while an async
+driver is bound to the event loop it is used on. The async driver and its
+connection pool therefore live on a single background event loop, shared by
+all sessions of the process. Callers hand coroutines to run_async() and
+block only until they finish, so queries started together with
+read_queries() take as long as the slowest of them instead of their sum.
+"""
+
+import asyncio
+import atexit
+import threading
+
+from neo4j import AsyncGraphDatabase
+
+from modules.config.config import (
+    NEO4J_MAX_POOL_SIZE,
+    NEO4J_ACQUISITION_TIMEOUT,
+    NEO4J_LIVENESS_CHECK_TIMEOUT,
+    NEO4J_MAX_CONNECTION_LIFETIME,
+)
+from modules.retrival.result_cache import query_result_cache
+from modules.utils.neo4j_functions import URI, AUTH
+
+_loop = None
+_driver = None
+_lock = threading.Lock()
+
+
+def get_event_loop():
+    """Return the background event loop, starting its thread on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="neo4j-async", daemon=True
+            ).start()
+        return _loop
+
+
+def run_async(coroutine):
+    """Run a coroutine on the background loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop()).result()
+
+
+def get_async_driver():
+    """Return the async driver, creating it on first use (loop thread only)"""
+    global _driver
+    if _driver is None:
+        _driver = AsyncGraphDatabase.driver(
+            URI,
+            auth=AUTH,
+            max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+            connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+            liveness_check_timeout=NEO4J_LIVENESS_CHECK_TIMEOUT,
+            max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+        )
+    return _driver
+
+
+async def read_query(query, params=None, limit=None, fetch_size=None, database=None):
+    """
+    Run a read query on the async driver
+
+    Args:
+        query (str): Cypher query
+        params (dict): Query parameters
+        limit (int): Stop pulling rows after this many, None for all
+        fetch_size (int): Rows pulled from the server per round trip
+        database (str): Database to query, None for the server default
+
+    Returns:
+        list: Result rows as dicts
+    """
+    session_config = {"fetch_size": fetch_size} if fetch_size else {}
+    if database:
+        session_config["database"] = database
+    rows = []
+    async with get_async_driver().session(**session_config) as session:
+        result = await session.run(query, params or {})
+        async for record in result:
+            rows.append(record.data())
+            if limit is not None and len(rows) >= limit:
+                break
+    return rows
+
+
+async def cached_read_query(query, params=None):
+    """read_query through the shared result cache"""
+    key, rows = query_result_cache.lookup(query, params)
+    if rows is not None:
+        return rows
+    rows = await read_query(query, params)
+    query_result_cache.store(key, rows)
+    return rows
+
+
+def read_queries(*queries):
+    """
+    Run several (query, params) read queries concurrently
+
+    Returns:
+        list: The rows of every query, in order
+    """
+    async def gather():
+        return await asyncio.gather(
+            *(cached_read_query(query, params) for query, params in queries)
+        )
+
+    return run_async(gather())
+
+
+def close_async_driver():
+    """Close the async driver and its pooled connections"""
+    global _driver
+    if _loop is None or _driver is None:
+        return
+
+    async def close():
+        global _driver
+        if _driver is not None:
+            await _driver.close()
+            _driver = None
+
+    run_async(close())
+
+
+atexit.register(close_async_driver)
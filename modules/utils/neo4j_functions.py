@@ -1,7 +1,21 @@
 from neo4j import GraphDatabase
 import os
 import json
+import time
+import atexit
+import tempfile
+import threading
+from collections import Counter, defaultdict
 from dotenv import load_dotenv
+from modules.config.config import (
+    NEO4J_BATCH_SIZE,
+    NEO4J_BATCH_RETRIES,
+    NEO4J_MAX_POOL_SIZE,
+    NEO4J_ACQUISITION_TIMEOUT,
+    NEO4J_LIVENESS_CHECK_TIMEOUT,
+    NEO4J_MAX_CONNECTION_LIFETIME,
+    STREAM_DEFERRED_MAX,
+)
 
 load_dotenv(override=True)
 
@@ -9,12 +23,36 @@ load_dotenv(override=True)
 URI = os.getenv("NEO4J_URI")
 AUTH = (os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
 
-driver = GraphDatabase.driver(URI, auth=AUTH)
+_driver = None
+_driver_lock = threading.Lock()
+
+
+def get_driver():
+    """
+    Return the process-wide Neo4j driver, creating it on first use
+
+    The driver is a connection pool: ingestion, the visualizer and the Query
+    Bot all borrow connections from it instead of opening their own, so
+    concurrent Streamlit sessions reuse established (and TLS-negotiated)
+    connections.
+    """
+    global _driver
+    with _driver_lock:
+        if _driver is None:
+            _driver = GraphDatabase.driver(
+                URI,
+                auth=AUTH,
+                max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                liveness_check_timeout=NEO4J_LIVENESS_CHECK_TIMEOUT,
+                max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+            )
+        return _driver
 
 
 def check_neo4j_connection():
     try:
-        with driver.session() as session:
+        with get_driver().session() as session:
             result = session.run("RETURN 1")
             if result.single()[0] == 1:
                 print("✅ Neo4j database connection is active.")
@@ -30,73 +68,334 @@ def get_data_from_json(file_path):
     return data
 
 
-def saving_nodes_to_neo4j(file_path=os.path.join("outputs", "parsed_code.json")):
-    data = get_data_from_json(file_path)
-    nodes = data.get("nodes", [])
+def is_from_files(record, file_paths):
+    """Check whether a node or relationship record was extracted from any of the files"""
+    if file_paths is None:
+        return True
+    source_files = record.get("properties", {}).get("source_files", [])
+    return any(f in file_paths for f in source_files)
+
+
+# Unions the row's provenance into the stored list instead of overwriting it
+SOURCE_FILES_UNION = "coalesce({var}.source_files, []) + [f IN row.source_files WHERE NOT f IN coalesce({var}.source_files, [])]"
+
+
+def quote_identifier(name):
+    """Quote a label or relationship type for use in Cypher"""
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def to_neo4j_property(value):
+    """Neo4j only stores primitives and lists of primitives; encode anything else as JSON"""
+    primitives = (str, int, float, bool)
+    if value is None or isinstance(value, primitives):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(v, primitives) for v in value):
+        if len({type(v) for v in value}) <= 1:
+            return list(value)
+    return json.dumps(value, default=str)
 
-    with GraphDatabase.driver(URI, auth=AUTH) as driver:
-        for node in nodes:
+
+def sanitize_properties(props):
+    return {
+        str(k): to_neo4j_property(v) for k, v in props.items() if v is not None
+    }
+
+
+def batched(rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+WRITE_COUNTERS = ("nodes_created", "relationships_created", "properties_set")
+
+
+def run_in_batches(driver, cypher, rows, description, batch_size=NEO4J_BATCH_SIZE, retries=NEO4J_BATCH_RETRIES):
+    """
+    Send rows to an UNWIND query in batches, retrying each failed batch
+
+    Returns:
+        Counter: Nodes created, relationships created and properties set,
+            summed from the summaries of the batches that committed. A row
+            that MERGEs an existing entity or MATCHes no endpoint adds
+            nothing, so this can be lower than the number of rows sent.
+    """
+    written = Counter()
+    for batch in batched(rows, batch_size):
+        for attempt in range(1, retries + 1):
             try:
-                label = node["type"]
-                node_id = str(node["id"])
-                props = node.get("properties", {})
-
-               
-                props["id"] = node_id
-                props["type"] = label
-                if "name" not in props:
-                    props["name"] = node_id
-                
-                prop_str = ", ".join([f"{k}: ${k}" for k in props])
-                cypher = f"MERGE (n:{label} {{id: $id}}) SET n += {{{prop_str}}}"
-
-                driver.execute_query(cypher, props)
-                print(f"✅ Node '{node_id}' of type '{label}' created successfully.")
+                summary = driver.execute_query(cypher, {"rows": batch}).summary
+                written.update({name: getattr(summary.counters, name) for name in WRITE_COUNTERS})
+                break
             except Exception as e:
-                print(f"❌ Error creating node '{node.get('id', '?')}': {e}")
+                if attempt == retries:
+                    print(f"❌ Error writing a batch of {len(batch)} {description}: {e}")
+                else:
+                    print(f"⚠️ Retrying a batch of {len(batch)} {description} ({attempt}/{retries}): {e}")
+                    time.sleep(2 ** (attempt - 1))
+    return written
 
 
-def saving_relationships_to_neo4j(file_path=os.path.join("outputs", "parsed_code.json")):
+def creating_id_constraints(driver, labels):
+    """Create an id uniqueness constraint per label so MERGE on id is index-backed"""
+    for label in sorted(labels):
+        try:
+            driver.execute_query(
+                f"CREATE CONSTRAINT IF NOT EXISTS FOR (n:{quote_identifier(label)}) REQUIRE n.id IS UNIQUE"
+            )
+        except Exception as e:
+            print(f"⚠️ Could not create id constraint for '{label}': {e}")
+
+
+def report_throughput(written, total, description, started):
+    """Print the counters returned by run_in_batches for total rows sent"""
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else float(total)
+    counts = ", ".join(f"{written[name]} {name.replace('_', ' ')}" for name in WRITE_COUNTERS)
+    print(f"✅ Sent {total} {description} in {elapsed:.1f}s ({rate:,.0f} rows/sec): {counts}")
+
+
+def build_node_rows(nodes):
+    """Group node records into UNWIND rows per label"""
+    rows_by_label = defaultdict(list)
+    for node in nodes:
+        label = node["type"]
+        node_id = str(node["id"])
+        props = dict(node.get("properties", {}))
+        source_files = props.pop("source_files", [])
+
+        props["id"] = node_id
+        props["type"] = label
+        if "name" not in props:
+            props["name"] = node_id
+
+        rows_by_label[label].append(
+            {"id": node_id, "props": sanitize_properties(props), "source_files": source_files}
+        )
+    return rows_by_label
+
+
+def build_relationship_rows(relationships):
+    """Group relationship records into UNWIND rows per (source label, type, target label)"""
+    rows_by_type = defaultdict(list)
+    for rel in relationships:
+        rel_props = dict(rel.get("properties", {}))
+        source_files = rel_props.pop("source_files", [])
+        key = (rel["source"]["type"], rel["relationship_type"], rel["target"]["type"])
+        rows_by_type[key].append(
+            {
+                "source_id": rel["source"]["id"],
+                "target_id": rel["target"]["id"],
+                "props": sanitize_properties(rel_props),
+                "source_files": source_files,
+            }
+        )
+    return rows_by_type
+
+
+def get_node_merge_query(label):
+    return f"""
+        UNWIND $rows AS row
+        MERGE (n:{quote_identifier(label)} {{id: row.id}})
+        SET n += row.props
+        SET n.source_files = {SOURCE_FILES_UNION.format(var='n')}
+    """
+
+
+def get_relationship_merge_query(source_type, rel_type, target_type):
+    return f"""
+        UNWIND $rows AS row
+        MATCH (a:{quote_identifier(source_type)} {{id: row.source_id}})
+        MATCH (b:{quote_identifier(target_type)} {{id: row.target_id}})
+        MERGE (a)-[r:{quote_identifier(rel_type)}]->(b)
+        SET r += row.props
+        SET r.source_files = {SOURCE_FILES_UNION.format(var='r')}
+    """
+
+
+def saving_nodes_to_neo4j(file_path=os.path.join("outputs", "parsed_code.json"), only_files=None):
     data = get_data_from_json(file_path)
-    relationships = data.get("relationships", [])
+    only_files = set(only_files) if only_files is not None else None
+    nodes = [n for n in data.get("nodes", []) if is_from_files(n, only_files)]
+    rows_by_label = build_node_rows(nodes)
 
-    with GraphDatabase.driver(URI, auth=AUTH) as driver:
-        for rel in relationships:
-            try:
-                source_id = rel["source"]["id"]
-                source_type = rel["source"]["type"]
-                target_id = rel["target"]["id"]
-                target_type = rel["target"]["type"]
-                rel_type = rel["relationship_type"]
-                rel_props = rel.get("properties", {})
-
-                
-                cypher = f"""
-                    MATCH (a:{source_type} {{id: $source_id}})
-                    MATCH (b:{target_type} {{id: $target_id}})
-                    MERGE (a)-[r:{rel_type}]->(b)
-                """
+    started = time.perf_counter()
+    written = Counter()
+    driver = get_driver()
+    creating_id_constraints(driver, rows_by_label)
+    for label, rows in rows_by_label.items():
+        written += run_in_batches(
+            driver, get_node_merge_query(label), rows, f"'{label}' nodes"
+        )
 
-                
-                params = {"source_id": source_id, "target_id": target_id}
-                if rel_props:
-                    rel_prop_str = ", ".join([f"{k}: ${k}" for k in rel_props])
-                    cypher += f" SET r += {{{rel_prop_str}}}"
-                    params.update(rel_props)
+    report_throughput(written, len(nodes), "nodes", started)
 
-                driver.execute_query(cypher, params)
-                print(
-                    f"✅ Relationship {rel_type} from {source_id} → {target_id} created successfully"
-                )
 
-            except Exception as e:
-                print(
-                    f"❌ Error creating relationship {rel.get('relationship_type', '?')} from {rel.get('source', {}).get('id', '?')} to {rel.get('target', {}).get('id', '?')}: {e}"
-                )
+def saving_relationships_to_neo4j(file_path=os.path.join("outputs", "parsed_code.json"), only_files=None):
+    data = get_data_from_json(file_path)
+    only_files = set(only_files) if only_files is not None else None
+    relationships = [
+        r for r in data.get("relationships", []) if is_from_files(r, only_files)
+    ]
+    rows_by_type = build_relationship_rows(relationships)
+
+    started = time.perf_counter()
+    written = Counter()
+    for (source_type, rel_type, target_type), rows in rows_by_type.items():
+        written += run_in_batches(
+            get_driver(),
+            get_relationship_merge_query(source_type, rel_type, target_type),
+            rows,
+            f"'{rel_type}' relationships",
+        )
+
+    report_throughput(written, len(relationships), "relationships", started)
+
+
+class GraphStreamWriter:
+    """
+    Write parsed file records to Neo4j in batches as they arrive
+
+    Nodes and relationships are buffered and flushed every batch_size rows,
+    nodes first so relationship MATCHes find their endpoints. Relationships
+    pointing at nodes not written yet (e.g. a call into a file that is still
+    being parsed) are deferred; every flush writes those whose endpoints
+    have appeared since, and the rest are spilled to a temporary file past
+    max_deferred and written at close(). This keeps the semantics of the
+    JSON-first savers: relationships whose endpoints never appear are
+    dropped. Only the (label, id) keys of written nodes stay in memory.
+    """
+
+    def __init__(self, driver, batch_size=NEO4J_BATCH_SIZE, max_deferred=STREAM_DEFERRED_MAX):
+        self.driver = driver
+        self.batch_size = batch_size
+        self.max_deferred = max_deferred
+        self.node_buffer = []
+        self.relationship_buffer = []
+        self.deferred_relationships = []
+        self.spill_file = None
+        self.seen_nodes = set()
+        self.constrained_labels = set()
+        self.nodes_written = Counter()
+        self.relationships_written = Counter()
+        self.nodes_total = 0
+        self.relationships_total = 0
+
+    def has_endpoints(self, rel):
+        return (
+            (rel["source"]["type"], str(rel["source"]["id"])) in self.seen_nodes
+            and (rel["target"]["type"], str(rel["target"]["id"])) in self.seen_nodes
+        )
+
+    def add(self, record):
+        for node in record.get("nodes", []):
+            self.seen_nodes.add((node["type"], str(node["id"])))
+        self.node_buffer.extend(record.get("nodes", []))
+        self.nodes_total += len(record.get("nodes", []))
+
+        for rel in record.get("relationships", []):
+            if self.has_endpoints(rel):
+                self.relationship_buffer.append(rel)
+            else:
+                self.deferred_relationships.append(rel)
+        self.relationships_total += len(record.get("relationships", []))
+
+        if len(self.node_buffer) + len(self.relationship_buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        rows_by_label = build_node_rows(self.node_buffer)
+        creating_id_constraints(self.driver, set(rows_by_label) - self.constrained_labels)
+        self.constrained_labels.update(rows_by_label)
+        for label, rows in rows_by_label.items():
+            self.nodes_written += run_in_batches(
+                self.driver, get_node_merge_query(label), rows,
+                f"'{label}' nodes", self.batch_size,
+            )
+        self.node_buffer = []
+
+        # Deferred relationships whose endpoints were just written go along
+        still_deferred = []
+        for rel in self.deferred_relationships:
+            (self.relationship_buffer if self.has_endpoints(rel) else still_deferred).append(rel)
+        self.deferred_relationships = still_deferred
+        if len(self.deferred_relationships) > self.max_deferred:
+            self.spill_deferred()
+
+        self.write_relationships(self.relationship_buffer)
+        self.relationship_buffer = []
+
+    def spill_deferred(self):
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile("w+", encoding="utf-8")
+        for rel in self.deferred_relationships:
+            self.spill_file.write(json.dumps(rel) + "\n")
+        self.deferred_relationships = []
+
+    def read_spilled(self):
+        """Yield the spilled relationships in batch_size lists"""
+        if self.spill_file is None:
+            return
+        self.spill_file.seek(0)
+        batch = []
+        for line in self.spill_file:
+            batch.append(json.loads(line))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def write_relationships(self, relationships):
+        rows_by_type = build_relationship_rows(relationships)
+        for (source_type, rel_type, target_type), rows in rows_by_type.items():
+            self.relationships_written += run_in_batches(
+                self.driver,
+                get_relationship_merge_query(source_type, rel_type, target_type),
+                rows,
+                f"'{rel_type}' relationships",
+                self.batch_size,
+            )
+
+    def close(self):
+        self.flush()
+        self.write_relationships(self.deferred_relationships)
+        self.deferred_relationships = []
+        for batch in self.read_spilled():
+            self.write_relationships(batch)
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+
+def saving_records_to_neo4j(records, batch_size=NEO4J_BATCH_SIZE):
+    """
+    Stream parsed file records into Neo4j as they are produced
+
+    Args:
+        records (iterable): Records from serialize_graph_info, e.g. a generator
+        batch_size (int): Rows buffered before each write
+
+    Returns:
+        list: Files whose records were written
+    """
+    started = time.perf_counter()
+    writer = GraphStreamWriter(get_driver(), batch_size)
+    written_files = []
+    for record in records:
+        writer.add(record)
+        written_files.append(record["file"])
+    writer.close()
+
+    report_throughput(writer.nodes_written, writer.nodes_total, "nodes", started)
+    report_throughput(
+        writer.relationships_written, writer.relationships_total, "relationships", started
+    )
+    return written_files
 
 
 def deleting_all_nodes_and_relationships():
-    with driver.session() as session:
+    with get_driver().session() as session:
         try:
             session.run("MATCH (n) DETACH DELETE n")
             print("🗑️ All nodes and relationships deleted successfully.")
@@ -104,8 +403,66 @@ def deleting_all_nodes_and_relationships():
             print(f"❌ Failed to delete nodes and relationships: {e}")
 
 
+def detaching_files_from_graph(file_paths):
+    """
+    Strip the given source files from the provenance of every node and
+    relationship. Records are only removed later by
+    deleting_orphaned_nodes_and_relationships, so the graph stays
+    queryable while the files are re-ingested.
+    """
+    if not file_paths:
+        return
+    with get_driver().session() as session:
+        try:
+            session.run(
+                """
+                MATCH ()-[r]->() WHERE any(f IN r.source_files WHERE f IN $files)
+                SET r.source_files = [f IN r.source_files WHERE NOT f IN $files]
+                """,
+                files=list(file_paths),
+            )
+            session.run(
+                """
+                MATCH (n) WHERE any(f IN n.source_files WHERE f IN $files)
+                SET n.source_files = [f IN n.source_files WHERE NOT f IN $files]
+                """,
+                files=list(file_paths),
+            )
+            print(f"✂️ Detached {len(file_paths)} files from the graph.")
+        except Exception as e:
+            print(f"❌ Failed to detach files from the graph: {e}")
+
+
+def deleting_orphaned_nodes_and_relationships():
+    """Delete nodes and relationships that no longer come from any source file"""
+    with get_driver().session() as session:
+        try:
+            session.run(
+                "MATCH ()-[r]->() WHERE r.source_files IS NOT NULL AND size(r.source_files) = 0 DELETE r"
+            )
+            session.run(
+                "MATCH (n) WHERE n.source_files IS NOT NULL AND size(n.source_files) = 0 DETACH DELETE n"
+            )
+            print("🗑️ Orphaned nodes and relationships deleted successfully.")
+        except Exception as e:
+            print(f"❌ Failed to delete orphaned nodes and relationships: {e}")
+
+
 def close_driver():
-    """Close the Neo4j driver connection"""
-    driver.close()
+    """
+    Close the shared Neo4j driver and its pooled connections
+
+    The next get_driver() call opens a new pool, so this is safe to call
+    between runs; it is also registered to run at interpreter exit.
+    """
+    global _driver
+    with _driver_lock:
+        if _driver is None:
+            return
+        _driver.close()
+        _driver = None
     print("🔌 Neo4j driver connection closed")
 
+
+atexit.register(close_driver)
+
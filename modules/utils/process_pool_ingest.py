@@ -0,0 +1,106 @@
+"""
+Multi-core ingestion for the CPU-bound, LLM-free extraction path
+
+The file list is sharded across worker processes. Each worker reads,
+parses and serializes its shard and folds it into a partial graph index
+(plain dicts, cheap to pickle); the parent merges the partial graphs in
+shard order, so the result matches a sequential run.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.utils.ast_parser import parse_code_with_ast, find_root_dir
+from modules.utils.file_utils import (
+    serialize_graph_info,
+    new_graph_index,
+    merge_record,
+    merge_graph_index,
+    load_graph_index,
+    write_graph_index,
+    clear_results_log,
+)
+
+# Shards per worker; more shards balance uneven file sizes across workers
+SHARDS_PER_WORKER = 4
+
+
+def shard_files(file_paths, shard_count):
+    """Split the files into contiguous shards, preserving walk order"""
+    shard_size = max(1, -(-len(file_paths) // shard_count))
+    return [
+        file_paths[start:start + shard_size]
+        for start in range(0, len(file_paths), shard_size)
+    ]
+
+
+def extract_record(file_path, root_dirs):
+    """Worker: extract one file into a serialized record, or None"""
+    try:
+        result = parse_code_with_ast(file_path, find_root_dir(file_path, root_dirs))
+    except Exception as e:
+        print(f"❌ Failed to read {file_path}: {e}")
+        return None
+    return serialize_graph_info(result) if result else None
+
+
+def extract_shard(file_paths, root_dirs):
+    """
+    Worker: extract a shard of files into a partial graph index
+
+    Returns:
+        tuple: (partial graph index, files whose extraction produced records)
+    """
+    index = new_graph_index()
+    extracted_files = []
+    for file_path in file_paths:
+        record = extract_record(file_path, root_dirs)
+        if record:
+            merge_record(index, record)
+            extracted_files.append(file_path)
+    return index, extracted_files
+
+
+def parse_files_in_processes(file_paths, processes=None, root_dirs=None, output_file=None):
+    """
+    Extract files with the AST parser across worker processes
+
+    Args:
+        file_paths (list): Files to parse
+        processes (int): Worker processes, None for every CPU core
+        root_dirs (list): Ingested directories, used to name modules
+        output_file (str): Path of the parsed JSON file, merged into if it exists
+
+    Returns:
+        list: Files whose results were saved
+    """
+    if not output_file:
+        output_file = os.path.join("outputs", "parsed_code.json")
+
+    processes = processes or os.cpu_count() or 1
+    shards = shard_files(file_paths, processes * SHARDS_PER_WORKER)
+    print(f"⚙️ Parsing {len(file_paths)} files in {len(shards)} shards on {processes} processes...")
+
+    clear_results_log(output_file)
+    index = load_graph_index(output_file)
+    saved_files = []
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # map() yields partial graphs in shard order, keeping the merge deterministic
+        for partial, extracted_files in executor.map(
+            extract_shard, shards, [root_dirs] * len(shards)
+        ):
+            merge_graph_index(index, partial)
+            saved_files.extend(extracted_files)
+
+    skipped = len(file_paths) - len(saved_files)
+    if skipped:
+        print(f"⚠️ {skipped} files produced no nodes and were skipped.")
+
+    json_file = write_graph_index(index, output_file)
+    if json_file:
+        print(f"🔗 You can view the JSON file: {json_file}")
+    else:
+        print("❌ Failed to save results to JSON.")
+
+    return saved_files
@@ -1,11 +1,32 @@
 import streamlit as st
-from modules.frontend.nodes_fromdb import get_full_codebase, build_network_graph, render_graph_in_streamlit
+from modules.frontend.nodes_fromdb import (
+    get_module_overview,
+    get_module_subgraph,
+    build_overview_graph,
+    build_network_graph,
+    render_graph_in_streamlit,
+)
 st.set_page_config(page_title="Codebase Visualizer", page_icon="📊", layout="wide")
 st.title("📊 Codebase Visualizer")
 
 if st.session_state.get("parsing_complete", False):
-    data = get_full_codebase()  # from Neo4j
-    net =  build_network_graph(data) # build PyVis graph
-    render_graph_in_streamlit(net)    
+    # Start from the aggregated module overview and expand one module or
+    # package at a time, so the rendered graph stays bounded
+    overview_nodes, overview_edges = get_module_overview()
+    options = ["Overview"] + sorted(n["id"] for n in overview_nodes)
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        selected = st.selectbox("Expand a module or package", options)
+    with col2:
+        hops = st.slider("Neighborhood hops", 0, 3, 1, disabled=selected == "Overview")
+
+    if selected == "Overview":
+        net = build_overview_graph(overview_nodes, overview_edges)
+        st.caption(f"{len(overview_nodes)} modules and packages, {len(overview_edges)} aggregated relationships")
+    else:
+        nodes, edges = get_module_subgraph(selected, hops)
+        net = build_network_graph(edges, nodes)
+        st.caption(f"{len(nodes)} nodes and {len(edges)} relationships around {selected}")
+    render_graph_in_streamlit(net)
 else:
     st.info("No analytics data is available. Run the analysis from the Home page first.")
\ No newline at end of file
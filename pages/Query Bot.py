@@ -1,6 +1,7 @@
 import streamlit as st
+from modules.config.config import QUERY_TOP_K
 from modules.frontend.styles import apply_main_styles
-from modules.retrival.query import process_codebase_query
+from modules.retrival.query import process_codebase_query, get_query_service
 from modules.frontend.querybot import show_query_results
 from modules.frontend.nodes_fromdb import render_graph_in_streamlit
 
@@ -56,11 +57,18 @@ else:
             
             with col3:
                 raw_results_count = len(result.get('raw_results', [])) if isinstance(result.get('raw_results'), list) else 0
-                st.metric("Results Count", raw_results_count)
+                st.metric("Results Count", f"{raw_results_count}+" if result.get('truncated') else raw_results_count)
             
             # Show raw results for debugging
             if result.get('raw_results'):
                 with st.expander("🔧 Raw Results (Debug)"):
+                    if result.get('truncated'):
+                        st.caption(
+                            f"The query returned more than {QUERY_TOP_K} rows; the answer and this "
+                            f"table only cover the first {len(result['raw_results'])}."
+                        )
+                    else:
+                        st.caption(f"Answers and this table are limited to the first {QUERY_TOP_K} rows of a query.")
                     st.json(result['raw_results'])
             
             # Show graph if we have raw results
@@ -87,6 +95,9 @@ else:
             if result.get('cypher_query'):
                 with st.expander("🔧 Generated Cypher Query"):
                     st.code(result['cypher_query'], language="cypher")
+
+            with st.expander("🗃️ Cache Statistics"):
+                st.json(get_query_service().cache_stats())
             
         else:
             st.error(f"❌ {result['answer']}")